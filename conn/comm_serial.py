@@ -1,5 +1,7 @@
+import os
 import sys
 import re
+import select
 import ctypes
 from ctypes import wintypes
 import threading
@@ -8,11 +10,28 @@ import serial
 import serial.tools.list_ports
 
 class CommSerial:
+    """
+    Porta serial com thread de leitura que entrega ao callback cada rajada recebida.
+
+    Modos de leitura (open_serial(reader=...)):
+    - "event" (padrão): espera bloqueante pelo 1º byte e fecha a rajada após um
+      silêncio de `gap_chars` tempos de caractere (calculado do baud rate).
+      O padrão gap_chars=0 entrega o que chegou assim que chega (menor latência,
+      como no HrtComm); quem precisa da rajada inteira num callback passa p.ex. 2.
+      Em POSIX usa select() no descritor; nos demais SOs, read() bloqueante do
+      pyserial com inter_byte_timeout.
+    - "poll": laço antigo com in_waiting e sleep de 10 ms.
+    """
+    POLL_S = 0.5  # espera máxima por byte antes de rechecar o pedido de parada
+
     def __init__(self):
         self._sp = None
         self._reader_thread = None
         self._reader_callback = None
         self._stop_reader = threading.Event()
+        self._reader_mode = "event"
+        self._gap_s = 0.01
+        self._wake = None  # pipe (POSIX) que acorda o select() no close
 
     # ---------------------- UTIL ----------------------
     @staticmethod
@@ -62,6 +81,12 @@ class CommSerial:
             }.get(up, serial.PARITY_NONE)
         return val
 
+    @staticmethod
+    def char_time(baudrate, bytesize=8, parity='N', stopbits=1) -> float:
+        """Duração de um caractere (start + dados + paridade + stop) em segundos."""
+        bits = 1 + int(bytesize) + (0 if CommSerial._map_parity(parity) == serial.PARITY_NONE else 1) + float(stopbits)
+        return bits / float(baudrate)
+
     @staticmethod
     def _map_stopbits(val):
         # aceita 1, 1.5, 2 ou constants
@@ -165,6 +190,49 @@ class CommSerial:
             self._reader_thread.start()
 
     def _reader_loop(self):
+        if self._reader_mode == "poll":
+            self._reader_loop_poll()
+        elif self._is_windows():
+            self._reader_loop_blocking()
+        else:
+            self._reader_loop_select()
+
+    def _reader_loop_select(self):
+        """POSIX: select() no descritor; a rajada termina após _gap_s sem bytes novos."""
+        sp = self._sp
+        fd = sp.fileno()
+        wake = self._wake[0]
+        while not self._stop_reader.is_set() and self.is_open:
+            try:
+                ready, _, _ = select.select([fd, wake], [], [], self.POLL_S)
+                if wake in ready:
+                    os.read(wake, 64)  # pedido de parada (ou sobra de um close anterior)
+                    continue
+                if not ready:
+                    continue
+                data = bytearray(sp.read(sp.in_waiting or 1))
+                while select.select([fd], [], [], self._gap_s)[0]:
+                    data += sp.read(sp.in_waiting or 1)
+                if data and self._reader_callback:
+                    self._reader_callback(bytes(data))
+            except (serial.SerialException, OSError, ValueError, TypeError):
+                # porta caiu ou foi fechada: encerra leitura
+                self._stop_reader.set()
+                break
+
+    def _reader_loop_blocking(self):
+        """read() bloqueante: timeout=POLL_S para o 1º byte e inter_byte_timeout=_gap_s para o fim da rajada."""
+        sp = self._sp
+        while not self._stop_reader.is_set() and self.is_open:
+            try:
+                data = sp.read(4096)
+                if data and self._reader_callback:
+                    self._reader_callback(data)
+            except serial.SerialException:
+                self._stop_reader.set()
+                break
+
+    def _reader_loop_poll(self):
         """Loop interno que verifica e lê dados da porta serial, chamando o callback."""
         while not self._stop_reader.is_set():
             if self.is_open:
@@ -186,15 +254,23 @@ class CommSerial:
             time.sleep(0.01)  # 10 ms
 
     # ---------------------- ABRIR/FECHAR/IO ----------------------
-    def open_serial(self, port, baudrate=9600, bytesize=8, parity='N', stopbits=1, func_read=None):
+    def open_serial(self, port, baudrate=9600, bytesize=8, parity='N', stopbits=1, func_read=None,
+                    reader="event", gap_chars=0.0):
         """
         Abre a porta serial especificada com os parâmetros de configuração.
         Aceita COMx e não-COM (ex.: CNCA0) no Windows.
+        reader: "event" (espera bloqueante) ou "poll" (in_waiting + sleep de 10 ms).
+        gap_chars: silêncio, em tempos de caractere, que encerra uma rajada no modo "event"
+                   (0 = entrega cada byte assim que chega, para quem monta o frame adiante).
         """
         try:
             if self._sp is not None and self._sp.is_open:
-                self._sp.close()
+                self.close_serial()
 
+            self._reader_mode = reader
+            self._gap_s = max(gap_chars * self.char_time(baudrate, bytesize, parity, stopbits), 0.0)
+            # select() (POSIX) e o modo "poll" leem sem bloquear; sem select, o read() é quem espera
+            blocking = reader == "event" and self._is_windows()
             port_norm = self._normalize_port_name(port)
             self._sp = serial.Serial(
                 port=port_norm,
@@ -202,8 +278,11 @@ class CommSerial:
                 bytesize=self._map_bytesize(bytesize),
                 parity=self._map_parity(parity),
                 stopbits=self._map_stopbits(stopbits),
-                timeout=0  # não bloqueante para o loop de leitura
+                timeout=self.POLL_S if blocking else 0,
+                inter_byte_timeout=max(self._gap_s, 0.001) if blocking else None,
             )
+            if not self._is_windows() and self._wake is None:
+                self._wake = os.pipe()
 
             if func_read is not None:
                 self.listen_reader(func_read)
@@ -216,14 +295,33 @@ class CommSerial:
 
     def close_serial(self):
         """Fecha a porta serial e encerra a thread de leitura."""
+        closed = False
         if self._sp is not None:
             if self._sp.is_open:
                 self._stop_reader.set()
+                if self._wake is not None:
+                    os.write(self._wake[1], b"\0")  # acorda o select()
+                elif hasattr(self._sp, "cancel_read"):
+                    self._sp.cancel_read()  # acorda um read() bloqueante
                 self._sp.close()
                 if self._reader_thread is not None:
                     self._reader_thread.join(timeout=1)
-                return True
-        return False
+                closed = True
+        self._close_wake()
+        return closed
+
+    def _close_wake(self):
+        """Fecha o pipe de despertar (se a thread de leitura já terminou; um novo é criado no open)."""
+        if self._wake is None:
+            return
+        if self._reader_thread is not None and self._reader_thread.is_alive():
+            return  # ainda pode estar no select(): o pipe fica para o próximo close
+        for fd in self._wake:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._wake = None
 
     def read_serial(self):
         """Lê os dados disponíveis na porta serial."""
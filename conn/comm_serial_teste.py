@@ -0,0 +1,127 @@
+# comm_serial_teste.py
+# ---------------------------------------------------------------------------
+# Medição dos modos de leitura do CommSerial num par pseudo-terminal (POSIX).
+# Para cada modo ("poll", "event" com gap de 2 caracteres e "event" com gap 0,
+# o usado pelo HrtComm) escreve frames pelo lado mestre do pty e mede:
+#   - latência da escrita até o callback ter recebido o frame inteiro (p50/p99);
+#   - tempo de close_serial() (acordar e encerrar a thread de leitura).
+# Confere ainda que ciclos de open/close não vazam descritores (pipe de despertar).
+# O pty não emula o baud rate: os números medem só o custo da leitura em si.
+#
+# Uso (na raiz do projeto, Linux/macOS):
+#   python -m conn.comm_serial_teste [--frames 200] [--size 20]
+# Sai com código 1 se algum byte se perder, um close demorar mais que POLL_S
+# ou os descritores abertos crescerem com os ciclos de open/close.
+# ---------------------------------------------------------------------------
+
+import argparse
+import math
+import os
+import pty
+import sys
+import threading
+import time
+import tty
+
+from conn.comm_serial import CommSerial
+
+MODES = (("poll", 2.0), ("event", 2.0), ("event", 0.0))
+BAUDRATE = 1200
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = math.ceil(p / 100.0 * len(sorted_values)) - 1  # nearest-rank
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+def run_mode(reader: str, gap_chars: float, frames: int, size: int) -> dict:
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    received = bytearray()
+    done = threading.Event()
+    expected = [0]
+
+    def callback(data: bytes):
+        received.extend(data)
+        if len(received) >= expected[0]:
+            done.set()
+
+    comm = CommSerial()
+    if not comm.open_serial(os.ttyname(slave), baudrate=BAUDRATE, func_read=callback,
+                            reader=reader, gap_chars=gap_chars):
+        raise RuntimeError("não abriu o pty")
+    latencies, lost = [], 0
+    try:
+        time.sleep(0.05)
+        for k in range(frames):
+            frame = bytes((k + i) & 0xFF for i in range(size))
+            received.clear()
+            done.clear()
+            expected[0] = size
+            t0 = time.perf_counter()
+            os.write(master, frame)
+            if not done.wait(2.0) or bytes(received[:size]) != frame:
+                lost += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1e3)
+        t0 = time.perf_counter()
+        comm.close_serial()
+        close_ms = (time.perf_counter() - t0) * 1e3
+    finally:
+        comm.close_serial()
+        os.close(master)
+        os.close(slave)
+    latencies.sort()
+    return {"p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99),
+            "lost": lost, "close_ms": close_ms}
+
+
+def open_fds() -> int:
+    return len(os.listdir("/dev/fd"))
+
+
+def check_fd_leak(cycles: int = 20) -> int:
+    """Descritores a mais depois de `cycles` ciclos de open_serial/close_serial."""
+    master, slave = pty.openpty()
+    try:
+        before = open_fds()
+        for _ in range(cycles):
+            comm = CommSerial()  # uma instância por conexão
+            comm.open_serial(os.ttyname(slave), baudrate=BAUDRATE, func_read=lambda data: None)
+            comm.close_serial()
+        return open_fds() - before
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Latência dos modos de leitura do CommSerial num pty.")
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--size", type=int, default=20, help="bytes por frame")
+    args = ap.parse_args(argv)
+    if os.name != "posix":
+        print("[ℹ️] Requer um pseudo-terminal POSIX (Linux/macOS).")
+        return 0
+
+    print(f"{'modo':>12} {'gap':>5} {'p50 ms':>8} {'p99 ms':>8} {'close ms':>9} {'perdas':>7}")
+    failed = False
+    for reader, gap_chars in MODES:
+        r = run_mode(reader, gap_chars, args.frames, args.size)
+        print(f"{reader:>12} {gap_chars:>5.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['close_ms']:>9.1f} {r['lost']:>7}")
+        if r["lost"] or r["close_ms"] > CommSerial.POLL_S * 1e3:
+            failed = True
+    leaked = check_fd_leak()
+    print(f"descritores vazados em 20 ciclos de open/close: {leaked}")
+    if leaked > 0:
+        failed = True
+    gap = CommSerial.char_time(BAUDRATE) * 2 * 1e3
+    print(f"(gap de 2 caracteres a {BAUDRATE} baud = {gap:.1f} ms de silêncio antes de entregar a rajada)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,21 @@
 
 from dataclasses import dataclass, field
-from collections import deque
 from typing import Dict, Tuple, Optional, Iterable, List
+from collections import OrderedDict
+from bisect import bisect_left
+import threading
 import numpy as np
 import time
 import json
+import struct
 import ast
 import os
 
+from db_files.db_types import DBModel
 from react.qt_compat import QObject, Slot
 from react.react_var import ReactVar
 from react.repeatFunction import RepeatFunction
-import control as ctrl
+# python-control é importado sob demanda (_discretize): a importação custa segundos
 
 
 __VERSION__ = "SimulTf 2025-08-22 r4 (input-normalization + safer clip)"
@@ -41,6 +45,196 @@ def _scalar(x) -> float:
     return float(np.array(x, dtype=float).squeeze())
 
 
+# ------------------------- discretização (c2d) com cache -------------------------
+
+def _round_coef(v: float) -> float:
+    return float(f"{float(v):.12g}")
+
+def _normalize_tf(num: Iterable[float], den: Iterable[float]) -> Tuple[tuple, tuple]:
+    """Remove zeros à esquerda e torna o denominador mônico (mesma TF → mesma chave)."""
+    def strip(coefs):
+        c = [float(v) for v in coefs]
+        while len(c) > 1 and c[0] == 0.0:
+            c.pop(0)
+        return c
+    num, den = strip(num), strip(den)
+    if not den or den[0] == 0.0:
+        raise ValueError("Denominador nulo.")
+    k = den[0]
+    return tuple(_round_coef(v / k) for v in num), tuple(_round_coef(v / k) for v in den)
+
+def _discretize(num: tuple, den: tuple, Ts: float, method: str):
+    """tf2ss + c2d; retorna (A, B, C, D) com B coluna e C linha."""
+    import control as ctrl
+    sys_ss = ctrl.tf2ss(ctrl.TransferFunction(list(num), list(den)))
+    sysd = ctrl.c2d(sys_ss, Ts, method=method)
+    A = np.array(sysd.A, dtype=float); n = A.shape[0]
+    return A, _as_col(sysd.B, n), _as_row(sysd.C, n), _scalar(sysd.D)
+
+class DiscretizationCache:
+    """
+    Cache LRU de modelos discretizados, chaveado por (num, den normalizados, Ts, método).
+    Com um `storage` (DBStorage), os modelos também são gravados na tabela TFCACHE
+    (JSON), para que reinícios e trocas de passo não recalculem modelos conhecidos.
+    A memória é compartilhada (o modelo só depende da chave); o banco é o de cada
+    chamada (`get(..., storage=)`), com `self.storage` como padrão.
+    """
+    TABLE = "TFCACHE"
+    COL = "MODEL"
+
+    def __init__(self, maxsize: int = 256, storage=None):
+        self.maxsize = max(1, int(maxsize))
+        self.storage = storage
+        self._lru: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(num: Iterable[float], den: Iterable[float], Ts: float, method: str = 'tustin') -> tuple:
+        num, den = _normalize_tf(num, den)
+        return (num, den, _round_coef(Ts), method)
+
+    @staticmethod
+    def _rowName(key: tuple) -> str:
+        num, den, Ts, method = key
+        return f"{method}|{Ts!r}|{json.dumps(list(num))}|{json.dumps(list(den))}"
+
+    def get(self, num: Iterable[float], den: Iterable[float], Ts: float, method: str = 'tustin',
+            storage=None):
+        """(A, B, C, D) discretizados; cópias, para que o chamador possa alterá-las."""
+        key = self.key(num, den, Ts, method)
+        storage = self.storage if storage is None else storage
+        with self._lock:
+            model = self._lru.get(key)
+            if model is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if model is None:
+            model = self._load(key, storage)
+            if model is None:
+                model = _discretize(key[0], key[1], key[2], method)
+                self._store(key, model, storage)
+            with self._lock:
+                self._lru[key] = model
+                self._lru.move_to_end(key)
+                while len(self._lru) > self.maxsize:
+                    self._lru.popitem(last=False)
+        A, B, C, D = model
+        return A.copy(), B.copy(), C.copy(), D
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def _load(self, key: tuple, storage):
+        if storage is None:
+            return None
+        try:
+            raw = storage.getRawData(self.TABLE, self._rowName(key), self.COL)
+        except Exception:
+            return None  # tabela ainda não existe
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            n = len(data["A"])
+            A = np.array(data["A"], dtype=float).reshape(n, n)
+            return A, _as_col(data["B"], n), _as_row(data["C"], n), float(data["D"])
+        except Exception as e:
+            print(f"[SimulTf] Modelo em cache inválido {key}: {e}")
+            return None
+
+    def _store(self, key: tuple, model: tuple, storage):
+        if storage is None:
+            return
+        A, B, C, D = model
+        payload = json.dumps({"A": A.tolist(), "B": B.tolist(), "C": C.tolist(), "D": D})
+        try:
+            storage.queueRawData(self.TABLE, self._rowName(key), self.COL, payload)
+        except Exception as e:
+            print(f"[SimulTf] Erro ao gravar cache de discretização: {e}")
+
+# Cache compartilhado pelos SimulTf do processo (cada um persiste no próprio banco)
+DISCRETIZATION_CACHE = DiscretizationCache()
+
+
+# ------------------------- linha de atraso (histórico t,u) -------------------------
+
+class DelayLine:
+    """
+    Histórico (t, u) em buffer pré-alocado, com o mesmo comportamento do antigo
+    deque(maxlen=4096): janela [start, end) sobre um buffer de 2x a capacidade,
+    compactado só quando chega ao fim (custo amortizado O(1)).
+    Timestamps são não decrescentes, então a busca de u(t-L) é O(log n) por
+    bisect em vez de uma varredura linear. (Listas Python + bisect com lo/hi
+    saem mais baratas por chamada que np.searchsorted em janelas pequenas.)
+    """
+    __slots__ = ('maxlen', '_t', '_u', '_start', '_end')
+
+    def __init__(self, maxlen: int = 4096):
+        self.maxlen = int(maxlen)
+        self._t = [0.0] * (2 * self.maxlen)
+        self._u = [0.0] * (2 * self.maxlen)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __iter__(self):
+        return zip(self._t[self._start:self._end], self._u[self._start:self._end])
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def copy(self) -> "DelayLine":
+        other = DelayLine(self.maxlen)
+        for t, u in self:
+            other.push(t, u)
+        return other
+
+    @property
+    def last_t(self) -> float:
+        return self._t[self._end - 1]
+
+    def push(self, t: float, u: float):
+        if self._end == len(self._t):
+            n = self._end - self._start
+            self._t[:n] = self._t[self._start:self._end]
+            self._u[:n] = self._u[self._start:self._end]
+            self._start, self._end = 0, n
+        self._t[self._end] = float(t)
+        self._u[self._end] = float(u)
+        self._end += 1
+        if self._end - self._start > self.maxlen:
+            self._start += 1
+
+    def u_at(self, t_query: float, keep_after: float) -> float:
+        """
+        Interpolação linear de u(t_query). Descarta antes as amostras antigas
+        (como o deque: enquanto houver >= 3 e a 2ª for anterior a keep_after).
+        """
+        start, end = self._start, self._end
+        t, u = self._t, self._u
+        if end - start >= 3:
+            k = bisect_left(t, keep_after, start + 1, end) - 1
+            start = self._start = min(k, end - 2)
+        if t_query <= t[start]:
+            return u[start]
+        if t_query >= t[end - 1]:
+            return u[end - 1]
+        # primeiro j com t[j] >= t_query; o intervalo é [j-1, j]
+        j = bisect_left(t, t_query, start, end)
+        t0, t1 = t[j - 1], t[j]
+        if t1 == t0:
+            return u[j]
+        a = (t_query - t0) / (t1 - t0)
+        return (1 - a) * u[j - 1] + a * u[j]
+
+
 # ------------------------- sistema discreto + atraso puro contínuo -------------------------
 
 @dataclass
@@ -54,15 +248,18 @@ class DiscreteSS:
 
     Ts: float
     delay_L: float = 0.0
-    hist: deque = field(default_factory=lambda: deque(maxlen=4096))  # deque[(t,u)]
+    hist: DelayLine = field(default_factory=DelayLine)  # histórico (t,u)
     last_u: float = 0.0
 
     @classmethod
-    def from_tf(cls, num: Iterable[float], den: Iterable[float], Ts: float, x0: Optional[np.ndarray] = None):
-        sys_ss = ctrl.tf2ss(ctrl.TransferFunction(num, den))
-        sysd = ctrl.c2d(sys_ss, Ts, method='tustin')
-        A = np.array(sysd.A, dtype=float); n = A.shape[0]
-        B = _as_col(sysd.B, n); C = _as_row(sysd.C, n); D = _scalar(sysd.D)
+    def from_tf(cls, num: Iterable[float], den: Iterable[float], Ts: float, x0: Optional[np.ndarray] = None,
+                cache: Optional[DiscretizationCache] = None, storage=None):
+        if cache is not None:
+            A, B, C, D = cache.get(num, den, Ts, method='tustin', storage=storage)
+        else:
+            nnum, nden = _normalize_tf(num, den)
+            A, B, C, D = _discretize(nnum, nden, float(Ts), 'tustin')
+        n = A.shape[0]
         x = _as_col(np.zeros((n, 1)) if x0 is None else np.array(x0, dtype=float), n)
         return cls(A=A, B=B, C=C, D=D, x=x, Ts=float(Ts))
 
@@ -70,41 +267,112 @@ class DiscreteSS:
         self.delay_L = max(0.0, float(seconds))
         self.last_u = float(seed_u)
         self.hist.clear()
-        self.hist.append((0.0, self.last_u))
+        self.hist.push(0.0, self.last_u)
 
     def _u_at(self, t_query: float) -> float:
         """Interpolação linear de u(t_query) no histórico com timestamps."""
-        if not self.hist:
+        if not len(self.hist):
             return self.last_u
-        keep_after = t_query - 2.0 * max(self.Ts, 1e-6)
-        while len(self.hist) >= 3 and self.hist[1][0] < keep_after:
-            self.hist.popleft()
-        if t_query <= self.hist[0][0]:
-            return float(self.hist[0][1])
-        if t_query >= self.hist[-1][0]:
-            return float(self.hist[-1][1])
-        for i in range(len(self.hist) - 1):
-            t0, u0 = self.hist[i]; t1, u1 = self.hist[i + 1]
-            if t0 <= t_query <= t1:
-                if t1 == t0: return float(u1)
-                a = (t_query - t0) / (t1 - t0)
-                return float((1 - a) * u0 + a * u1)
-        return float(self.hist[-1][1])
+        return self.hist.u_at(t_query, keep_after=t_query - 2.0 * max(self.Ts, 1e-6))
 
-    def step(self, u: float, t_now: float) -> float:
+    def _push_input(self, u: float, t_now: float) -> float:
+        """Registra u(t_now) no histórico e retorna a entrada efetiva u(t_now - L)."""
         u = float(u)
         self.last_u = u
-        if not self.hist or t_now >= self.hist[-1][0]:
-            self.hist.append((t_now, u))
+        if not len(self.hist) or t_now >= self.hist.last_t:
+            self.hist.push(t_now, u)
         else:
-            self.hist.append((self.hist[-1][0] + 1e-12, u))
+            self.hist.push(self.hist.last_t + 1e-12, u)
+        return self._u_at(t_now - self.delay_L) if self.delay_L > 0 else u
 
-        u_eff = self._u_at(t_now - self.delay_L) if self.delay_L > 0 else u
-        y = float(self.C @ self.x + self.D * u_eff)
+    def step(self, u: float, t_now: float) -> float:
+        u_eff = self._push_input(u, t_now)
+        y = _scalar(self.C @ self.x + self.D * u_eff)
         self.x = self.A @ self.x + self.B * u_eff
         return y
 
 
+# ------------------------- passo em lote (vários SISO) -------------------------
+
+class _SSBatch:
+    """
+    Empacota vários DiscreteSS (SISO) em arrays empilhados com zero-padding até a
+    maior ordem: A (N,n,n), B (N,n), C (N,n), D (N,), X (N,n). Um passo de todas
+    as malhas é um único einsum, independente do número de sistemas.
+
+    O estado de cada DiscreteSS passa a ser uma *view* de X (dsys.x), de modo que
+    leituras/escritas in-place continuam valendo; se algum dsys.x for reatribuído,
+    `stale()` acusa e o lote deve ser reconstruído.
+    """
+    def __init__(self, items: List[Tuple[Tuple[str, str, str], DiscreteSS]]):
+        self.keys = [key for key, _ in items]
+        self.systems = [dsys for _, dsys in items]
+        N = len(self.systems)
+        n = max((d.A.shape[0] for d in self.systems), default=0)
+        self.A = np.zeros((N, n, n)); self.B = np.zeros((N, n))
+        self.C = np.zeros((N, n)); self.D = np.zeros(N)
+        self.X = np.zeros((N, n))
+        for k, d in enumerate(self.systems):
+            m = d.A.shape[0]
+            self.A[k, :m, :m] = d.A
+            self.B[k, :m] = d.B[:, 0]
+            self.C[k, :m] = d.C[0, :]
+            self.D[k] = d.D
+            self.X[k, :m] = d.x[:, 0]
+            d.x = self.X[k, :m].reshape(m, 1)  # view
+        self._views = [d.x for d in self.systems]
+
+    def stale(self) -> bool:
+        return any(d.x is not v for d, v in zip(self.systems, self._views))
+
+    def step(self, u_eff: np.ndarray) -> np.ndarray:
+        """Um passo de todos os sistemas com as entradas efetivas (já atrasadas); retorna y (N,)."""
+        y = np.einsum('kn,kn->k', self.C, self.X) + self.D * u_eff
+        self.X[...] = np.einsum('kij,kj->ki', self.A, self.X) + self.B * u_eff[:, None]
+        return y
+
+
+# ------------------------- snapshot binário do estado -------------------------
+
+# magic, versão, ordem n, amostras h, delay_L, last_u; seguido de float64: x[n], t[h], u[h]
+_STATE_MAGIC = b"TFSS"
+_STATE_VERSION = 1
+_STATE_HEADER = struct.Struct("<4sHHIdd")
+
+def _pack_state(dsys: DiscreteSS) -> bytes:
+    """
+    Estado de uma malha em blob binário (float64, little-endian) com cabeçalho versionado.
+    Os instantes do histórico são gravados relativos à última amostra (que fica em 0.0),
+    alinhados ao relógio que recomeça em start().
+    """
+    x = np.ascontiguousarray(dsys.x, dtype='<f8').ravel()
+    hist = list(dsys.hist)
+    t = np.array([h[0] for h in hist], dtype='<f8'); u = np.array([h[1] for h in hist], dtype='<f8')
+    if len(t):
+        t -= t[-1]
+    header = _STATE_HEADER.pack(_STATE_MAGIC, _STATE_VERSION, len(x), len(t),
+                                float(dsys.delay_L), float(dsys.last_u))
+    return header + x.tobytes() + t.tobytes() + u.tobytes()
+
+def _unpack_state(dsys: DiscreteSS, blob: bytes):
+    magic, version, n, h, delay_L, last_u = _STATE_HEADER.unpack_from(blob)
+    if magic != _STATE_MAGIC or version != _STATE_VERSION:
+        raise ValueError(f"snapshot desconhecido ({magic!r} v{version})")
+    data = np.frombuffer(blob, dtype='<f8', count=n + 2 * h, offset=_STATE_HEADER.size)
+    x = _as_col(data[:n], dsys.A.shape[0])
+    if dsys.x.shape == x.shape:
+        dsys.x[...] = x  # preserva a view do lote
+    else:
+        dsys.x = x
+    dsys.delay_L = delay_L
+    dsys.last_u = last_u
+    dsys.hist.clear()
+    for t_i, u_i in zip(data[n:n + h].tolist(), data[n + h:].tolist()):
+        dsys.hist.push(t_i, u_i)
+    if not len(dsys.hist):
+        dsys.hist.push(0.0, last_u)
+
+
 # ------------------------- parsing do tFunc -------------------------
 
 def _parse_tfunc(tfunc: str):
@@ -154,8 +422,13 @@ class SimulTf(QObject):
     Simulador de TF(s) com **atraso puro contínuo** (sem Padé):
     • discretização por Tustin (c2d)
     • atraso via histórico (t,u) + interpolação linear (independente de jitter)
+    • cada tick avança o modelo exatamente um Ts: ticks atrasados são recuperados
+      (overrun="catch_up", até MAX_CATCH_UP seguidos) para o tempo simulado não
+      ficar para trás do relógio; só além disso os slots são descartados
     """
-    def __init__(self, stepTime_ms: int):
+    MAX_CATCH_UP = 10
+
+    def __init__(self, stepTime_ms: int, dcache: Optional[DiscretizationCache] = None):
         super().__init__()
         self.stepTime = int(stepTime_ms)
         self.Ts = max(1e-6, self.stepTime / 1000.0)
@@ -164,8 +437,11 @@ class SimulTf(QObject):
         self.systems: Dict[Tuple[str, str, str], DiscreteSS] = {}
         self._system_models: Dict[Tuple[str, str, str], Tuple[list, list, float]] = {}
 
-        self._repeated_function = RepeatFunction(self._simulation_step, self.stepTime)
+        self._repeated_function = self._new_repeat()
         self._t0_wall: Optional[float] = None  # base do relógio monotônico
+        self._batch: Optional[_SSBatch] = None  # reconstruído quando os sistemas mudam
+        self.dcache = DISCRETIZATION_CACHE if dcache is None else dcache
+        self.storage = None  # banco da factory das tFunc conectadas (TFCACHE)
 
         # DEBUG opcional (setar env SIMUL_TF_DEBUG=1)
         self._debug = os.environ.get("SIMUL_TF_DEBUG", "0") == "1"
@@ -183,7 +459,8 @@ class SimulTf(QObject):
                 print(f"[SimulTf] Erro ao parsear tFunc '{tfunc}': {e}")
                 return
             try:
-                dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts)
+                self.storage = data.reactFactory.storage  # persiste modelos em TFCACHE
+                dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts, cache=self.dcache, storage=self.storage)
                 # Usa heurística também para o seed
                 seed_u_raw = float(data.inputValue) if data.inputValue is not None else 0.0
                 seed_u = _normalize_input(seed_u_raw)
@@ -197,6 +474,7 @@ class SimulTf(QObject):
             self.dictDB.pop(key, None)
             self.systems.pop(key, None)
             self._system_models.pop(key, None)
+        self._batch = None
 
     def start(self, state: bool):
         if state:
@@ -226,27 +504,162 @@ class SimulTf(QObject):
             self._t0_wall = time.monotonic()
         return time.monotonic() - self._t0_wall
 
-    def _simulation_step(self):
-        t_now = self._now()
-        self._dbg_tick += 1
-        for key, dsys in self.systems.items():
-            var = self.dictDB.get(key)
-            if var is None:
-                continue
-            u_raw = float(var.inputValue) if var.inputValue is not None else 0.0
-            u = _normalize_input(u_raw)   # <<< normalização robusta
-            y = dsys.step(u, t_now)
-
-            # Clipa a saída em [0,1] (sem piso 0.0001 para não "travar" visualmente)
-            new_val = float(np.clip(y, 0.0, 1.0))
+    def _ensure_batch(self) -> _SSBatch:
+        batch = self._batch
+        if batch is None or batch.stale():
+            items = [(key, dsys) for key, dsys in self.systems.items() if key in self.dictDB]
+            batch = self._batch = _SSBatch(items)
+        return batch
 
-            # DEBUG opcional a cada ~20 ticks
-            if self._debug and (self._dbg_tick % 20 == 0):
-                print(f"[SimulTf][{key}] t={t_now:.3f}  u_raw={u_raw:.2f} -> u={u:.3f}  y={new_val:.3f}")
+    def _new_repeat(self) -> RepeatFunction:
+        return RepeatFunction(self._simulation_step, self.stepTime,
+                              overrun="catch_up", max_catch_up=self.MAX_CATCH_UP)
 
-            # Emite alteração
-            var._value = new_val
-            var.valueChangedSignal.emit(var)
+    def _simulation_step(self):
+        self._step(self._now())
+
+    @staticmethod
+    def _advance(batch: _SSBatch, u_raw: np.ndarray, t_now: float) -> List[float]:
+        """Normaliza as entradas, aplica o atraso de cada malha e dá um passo do lote; retorna y."""
+        u_eff = np.empty(len(batch.systems))
+        for k, dsys in enumerate(batch.systems):
+            u = _normalize_input(u_raw[k])   # <<< normalização robusta
+            u_eff[k] = dsys._push_input(u, t_now)
+        # Clipa a saída em [0,1] (sem piso 0.0001 para não "travar" visualmente)
+        return np.clip(batch.step(u_eff), 0.0, 1.0).tolist()
+
+    def _step(self, t_now: float) -> Optional[List[float]]:
+        """Avança todas as malhas um passo no instante t_now; retorna as saídas (ordem do lote)."""
+        self._dbg_tick += 1
+        batch = self._ensure_batch()
+        if not batch.keys:
+            return None
+
+        # entradas (normalização + atraso puro) e um único passo em lote para todas as malhas
+        vars_ = [self.dictDB[key] for key in batch.keys]
+        u_raw = np.array([float(v.inputValue) if v.inputValue is not None else 0.0 for v in vars_])
+        ys = self._advance(batch, u_raw, t_now)
+
+        # Grava e propaga todas as saídas do passo de uma vez, sob graph.lock: cada
+        # dependente é reavaliado uma única vez, em ordem topológica, e os sinais
+        # são emitidos ao final, já sem a trava
+        graph = vars_[0].reactFactory.graph
+        changed = []
+        with graph.lock:
+            for k, (key, var, dsys, new_val) in enumerate(zip(batch.keys, vars_, batch.systems, ys)):
+                # DEBUG opcional a cada ~20 ticks
+                if self._debug and (self._dbg_tick % 20 == 0):
+                    print(f"[SimulTf][{key}] t={t_now:.3f}  u_raw={u_raw[k]:.2f} -> u={dsys.last_u:.3f}  y={new_val:.3f}")
+                if var._value != new_val:
+                    var._value = new_val
+                    changed.append(var)
+            updated = graph.propagate(*changed, emit=False)
+        if changed:
+            graph.emit(*changed, *updated)
+        return ys
+
+    # ------------------------- simulação em lote (relógio virtual) -------------------------
+
+    def run_batch(self, duration_s: float, inputs: Optional[dict] = None,
+                  record: Optional[Iterable] = None) -> dict:
+        """
+        Simula `duration_s` segundos de processo num relógio virtual, tão rápido quanto
+        a CPU permitir, sem emitir sinais nem gravar no banco.
+
+        Roda sobre cópias privadas: as malhas (estado e histórico) são copiadas e os
+        valores dos ReactVar ficam num dicionário próprio, lido sobre os valores vivos
+        do início do lote. Nada do que é vivo é alterado, então escritas Modbus/HART
+        feitas durante o lote são preservadas e os servidores nunca veem o relógio virtual.
+
+        inputs: {ReactVar | "TABELA.COLUNA.LINHA": valor | sequência[passo] | callable(t)}
+                aplicado antes de cada passo (t em segundos desde o início do lote).
+        record: ReactVar/tokens adicionais a registrar a cada passo.
+
+        Retorna {"t": (n,), "keys": [...], "u": (n,N), "y": (n,N), "vars": {token: (n,)}},
+        com u = entrada normalizada e y = saída de cada malha (na ordem de "keys").
+        """
+        if self._repeated_function.running:
+            raise RuntimeError("run_batch() indisponível com a simulação em tempo real ativa.")
+        steps = int(round(float(duration_s) / self.Ts))
+        live = self._ensure_batch()
+        factory = next(iter(self.dictDB.values())).reactFactory if self.dictDB else None
+
+        def resolve(ref):
+            if isinstance(ref, ReactVar):
+                return ref
+            if factory is None:
+                raise ValueError(f"Sem tFunc conectada para resolver '{ref}'.")
+            table, col, row = str(ref).split('.')
+            return factory.df[table].at[row, col]
+
+        def token(var: ReactVar) -> str:
+            return f"{var.tableName}.{var.colName}.{var.rowName}"
+
+        schedule = [(resolve(ref), src) for ref, src in (inputs or {}).items()]
+        recorded = [resolve(ref) for ref in (record or ())]
+
+        # cópias privadas: malhas e valores (overlay sobre os ReactVar vivos)
+        batch = _SSBatch([(key, DiscreteSS(A=d.A, B=d.B, C=d.C, D=d.D, x=d.x.copy(), Ts=d.Ts,
+                                           delay_L=d.delay_L, hist=d.hist.copy(), last_u=d.last_u))
+                          for key, d in zip(live.keys, live.systems)])
+        tf_vars = [self.dictDB[key] for key in batch.keys]
+        values: Dict[ReactVar, object] = {}
+        u_in = {v: v.inputValue for v in tf_vars}
+
+        def value(var):
+            return values[var] if var in values else var._value
+
+        def propagate(sources):
+            """Como ReactGraph.propagate, mas lendo e gravando só em `values`/`u_in`."""
+            changed = set(sources)
+            for level in factory.graph.levels(sources):
+                for node in level:
+                    if not any(i in changed for i in factory.graph.inputs(node)):
+                        continue
+                    expr = node._expr
+                    result = 0.0 if expr is None else \
+                        expr([None if v is None else value(v) for v in node._inputVars])
+                    if node.model == DBModel.tFunc:
+                        u_in[node] = result
+                    elif value(node) != result:
+                        values[node] = result
+                        changed.add(node)
+
+        N = len(batch.keys)
+        t_out = np.empty(steps); u_out = np.empty((steps, N)); y_out = np.empty((steps, N))
+        v_out = {token(v): np.empty(steps) for v in recorded}
+        t0 = max((d.hist.last_t for d in batch.systems if len(d.hist)), default=0.0)
+        for k in range(steps):
+            t_rel = (k + 1) * self.Ts
+            changed = []
+            for var, src in schedule:
+                new = src(t_rel) if callable(src) else \
+                      src[min(k, len(src) - 1)] if isinstance(src, (list, tuple, np.ndarray)) else src
+                if value(var) != new:
+                    values[var] = new
+                    changed.append(var)
+            if changed:
+                propagate(changed)
+            t_out[k] = t_rel
+            if N:
+                u_raw = np.array([float(u_in[v]) if u_in[v] is not None else 0.0 for v in tf_vars])
+                ys = self._advance(batch, u_raw, t0 + t_rel)
+                y_out[k] = ys
+                u_out[k] = [d.last_u for d in batch.systems]
+                changed = []
+                for var, y in zip(tf_vars, ys):
+                    if value(var) != y:
+                        values[var] = y
+                        changed.append(var)
+                if changed:
+                    propagate(changed)
+            for v in recorded:
+                try:
+                    v_out[token(v)][k] = float(value(v))
+                except (TypeError, ValueError):
+                    v_out[token(v)][k] = np.nan
+
+        return {"t": t_out, "keys": list(batch.keys), "u": u_out, "y": y_out, "vars": v_out}
 
     # ------------------------- sincronismo de StepTimer -------------------------
     def set_step_time_ms(self, step_ms: int):
@@ -268,7 +681,7 @@ class SimulTf(QObject):
         self.stepTime = step_ms
         self.Ts = max(1e-6, self.stepTime / 1000.0)
         try:
-            self._repeated_function = RepeatFunction(self._simulation_step, self.stepTime)
+            self._repeated_function = self._new_repeat()
         except Exception as e:
             print(f"[SimulTf] Falha ao recriar RepeatFunction: {e}")
 
@@ -279,11 +692,13 @@ class SimulTf(QObject):
                 continue
             num, den, delay = model
             try:
-                new_dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts, x0=old_dsys.x)
+                new_dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts, x0=old_dsys.x, cache=self.dcache,
+                                          storage=self.storage)
                 new_dsys.set_delay(seconds=old_dsys.delay_L, seed_u=old_dsys.last_u)
                 self.systems[key] = new_dsys
             except Exception as e:
                 print(f"[SimulTf] Falha ao re-discretizar {key}: {e}")
+        self._batch = None
         self._t0_wall = time.monotonic()
         if was_running:
             try: self._repeated_function.start()
@@ -292,33 +707,46 @@ class SimulTf(QObject):
     # ------------------------- persistência -------------------------
 
     def save_states(self):
+        """
+        Grava o estado de todas as malhas numa única transação (troca atômica):
+        um blob binário por malha na tabela TFSTATES (ver _pack_state).
+        """
+        items = []
+        storage = None
         for key, dsys in self.systems.items():
             var = self.dictDB.get(key)
             if not var:
                 continue
+            storage = var.reactFactory.storage
             row = "|".join(key[:-1]); col = key[-1]
             try:
-                payload = {
-                    "A": dsys.A.tolist(), "B": dsys.B.tolist(), "C": dsys.C.tolist(),
-                    "D": dsys.D, "x": dsys.x.tolist(),
-                    "delay_L": dsys.delay_L, "last_u": dsys.last_u,
-                    "hist": list(dsys.hist)[-64:],
-                }
-                s = json.dumps(payload)
-                var.reactFactory.storage.setRawData("TFSTATES", row, col, s)
+                items.append((("TFSTATES", row, col), _pack_state(dsys)))
             except Exception as e:
                 print(f"[SimulTf] Erro ao salvar estado {key}: {e}")
+        if items:
+            storage.setRawDataMany(items)
 
     def load_states(self):
+        """Lê TFSTATES de uma vez; aceita o blob binário e, como fallback, o JSON antigo."""
+        if not self.dictDB:
+            return
+        storage = next(iter(self.dictDB.values())).reactFactory.storage
+        try:
+            _, rows = storage.tableSnapshot("TFSTATES")
+        except Exception:
+            return  # tabela ainda não existe
         for key, var in list(self.dictDB.items()):
             dsys = self.systems.get(key)
             if not dsys:
                 continue
             row = "|".join(key[:-1]); col = key[-1]
             try:
-                raw = var.reactFactory.storage.getRawData("TFSTATES", row, col)
+                raw = rows.get(row, {}).get(col)
                 if not raw:
                     continue
+                if isinstance(raw, (bytes, bytearray, memoryview)):
+                    _unpack_state(dsys, bytes(raw))
+                    continue
                 data = json.loads(raw)
 
                 if isinstance(data, list):
@@ -338,10 +766,10 @@ class SimulTf(QObject):
                         for item in hist:
                             try:
                                 t_i, u_i = float(item[0]), float(item[1])
-                                dsys.hist.append((t_i, u_i))
+                                dsys.hist.push(t_i, u_i)
                             except Exception:
                                 pass
                     else:
-                        dsys.hist.append((0.0, dsys.last_u))
+                        dsys.hist.push(0.0, dsys.last_u)
             except Exception as e:
                 print(f"[SimulTf] Erro ao carregar estado {key}: {e}")
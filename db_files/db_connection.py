@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# PRAGMAs aplicados a cada conexão nova (uma vez por thread)
+DEFAULT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # leitores não bloqueiam o escritor
+    "PRAGMA synchronous=NORMAL",     # seguro com WAL e bem mais rápido que FULL
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8192",       # ~8 MiB de cache de páginas
+    "PRAGMA busy_timeout=5000",      # espera até 5 s se outra conexão segurar o lock
+)
+
+class DBConnection():
+    """
+    Gerenciador de conexões SQLite: uma conexão de longa duração por thread.
+
+    - Evita o ciclo connect/close a cada leitura/escrita.
+    - Aplica WAL e PRAGMAs ajustados na abertura.
+    - Usa o cache de statements do sqlite3 (`cached_statements`): como os
+      comandos são parametrizados, o texto SQL se repete e o statement
+      preparado é reaproveitado.
+    """
+
+    def __init__(self, db_path: str, cached_statements: int = 256, pragmas=DEFAULT_PRAGMAS):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: list[sqlite3.Connection] = []
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # close_all() pode fechar a partir de outra thread
+        )
+        for pragma in self.pragmas:
+            try:
+                conn.execute(pragma)
+            except sqlite3.Error as e:
+                print(f"[WARN] {pragma} falhou: {e}")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexão da thread atual (aberta sob demanda)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Executa um comando de leitura na conexão da thread atual."""
+        return self.conn.execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Bloco transacional: commit ao sair, rollback em caso de exceção."""
+        conn = self.conn
+        with conn:
+            yield conn.cursor()
+
+    def close_all(self):
+        """Fecha todas as conexões abertas (chamar no encerramento da aplicação)."""
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from typing import Optional
+import re
+
+# Ordem importa: BIT_ENUM antes de ENUM, PACKED_ASCII antes de ASCII
+TYPE_FAMILIES = ('BIT_ENUM', 'ENUM', 'UNSIGNED', 'INTEGER', 'FLOAT',
+                 'DATE', 'TIME', 'PACKED', 'ASCII', 'BOOL')
+
+@dataclass(frozen=True)
+class RowMeta:
+    """Metadados de uma linha (TYPE/BYTE_SIZE) já interpretados."""
+    typeName: Optional[str]
+    byteSize: Optional[int]
+    family: str = ''
+    enumIndex: Optional[int] = None
+
+    @classmethod
+    def parse(cls, typeName, byteSize) -> "RowMeta":
+        typeName = None if typeName is None else str(typeName)
+        try:
+            byteSize = None if byteSize is None else int(byteSize)
+        except (TypeError, ValueError):
+            byteSize = None
+        upper = (typeName or '').upper()
+        family = next((f for f in TYPE_FAMILIES if f in upper), '')
+        enumIndex = None
+        if family in ('ENUM', 'BIT_ENUM'):
+            m = re.search(r'(\d+)$', upper)
+            enumIndex = int(m.group(1)) if m else None
+        return cls(typeName, byteSize, family, enumIndex)
@@ -6,6 +6,9 @@ import sys
 import os
 import shutil
 import platform
+from db_files.db_connection import DBConnection
+from db_files.db_meta import RowMeta
+from db_files.db_write_behind import DBWriteBehind, MISSING
 
 def get_app_data_dir(app_name="processSimul"):
     """Retorna a pasta apropriada para dados persistentes da aplicação."""
@@ -37,32 +40,43 @@ def get_persistent_db_path(relative_path="db/banco.db", app_name="processSimul")
 class DBStorage():
     # data_updated = Signal()  # Sinal emitido ao atualizar dados
         
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, persistent: bool = True):
         # super().__init__()
-        self.db_name = get_persistent_db_path(db_name, 'processSimul')
+        # persistent=False abre `db_name` como está (p.ex. uma cópia temporária do banco)
+        self.db_name = get_persistent_db_path(db_name, 'processSimul') if persistent else db_name
+        self._db = DBConnection(self.db_name)
+        # Índice de metadados por tabela: {tabela: {NAME: RowMeta}}
+        self._meta: dict[str, dict[str, RowMeta]] = {}
+        # Escritas adiadas de ReactVar.setValue/setFunc/setTFunc
+        self._writer = DBWriteBehind(self._writeMany)
+        # Registro de esquema: DDL só na primeira vez que tabela/coluna aparecem
+        self._schema: dict[str, set] = {}   # {tabela: colunas conhecidas}
+        self._upsert: dict[str, bool] = {}  # {tabela: NAME é único (permite UPSERT)}
 
     def rowKeys(self, tableName: str) -> list:
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f'SELECT NAME FROM {tableName}_tabela;')
-            return [linha[0] for linha in cursor.fetchall()]
+        cursor = self._db.execute(f'SELECT NAME FROM {tableName}_tabela;')
+        return [linha[0] for linha in cursor.fetchall()]
 
     def colKeys(self, tableName: str) -> list:
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            # Executa PRAGMA para obter informações da estrutura da tabela
-            cursor.execute(f"PRAGMA table_info({tableName}_tabela)")
-            colunas = cursor.fetchall()    
-            return [coluna[1] for coluna in colunas[1:]]
+        # Executa PRAGMA para obter informações da estrutura da tabela
+        cursor = self._db.execute(f"PRAGMA table_info({tableName}_tabela)")
+        colunas = cursor.fetchall()
+        return [coluna[1] for coluna in colunas[1:]]
         
     def getRawData(self, tableName: str, rowName: str, colName: str) -> str:
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT {colName} FROM {tableName}_tabela WHERE NAME = ?", (rowName,))
-            result = cursor.fetchone()
-            return result[0] if result else None    
+        pending = self._writer.get((tableName, rowName, colName))
+        if pending is not MISSING:
+            return pending
+        cursor = self._db.execute(f"SELECT {colName} FROM {tableName}_tabela WHERE NAME = ?", (rowName,))
+        result = cursor.fetchone()
+        return result[0] if result else None
         
     def getData(self, tableName: str, rowName: str, colName: str) -> str:
+        return self.resolveData(rowName, lambda var: self.getRawData(tableName, var, colName))
+
+    @staticmethod
+    def resolveData(rowName: str, fetch) -> str:
+        """Resolve nomes compostos ('a | b', 'a & b') usando `fetch(nome) -> valor bruto`."""
         if '|' in rowName:
             variables = rowName.split(' | ')
             operation = operator.or_
@@ -74,7 +88,7 @@ class DBStorage():
             operation = None
         values = []
         for var in variables:
-            values.append(self.getRawData(tableName, var, colName))  # usar 'var' aqui
+            values.append(fetch(var))  # usar 'var' aqui
 
         if any(v in (None, "ERROR") for v in values):
             return None
@@ -83,38 +97,166 @@ class DBStorage():
             return str(reduce(operation, map(int, values)))
         return str(values[0])
 
+    def tableSnapshot(self, tableName: str) -> tuple[list, dict]:
+        """
+        Lê a tabela inteira com um único SELECT *.
+        Retorna (colunas sem NAME, {NAME: {coluna: valor bruto}}) na ordem do banco.
+        """
+        self._writer.flush()
+        cursor = self._db.execute(f"SELECT * FROM {tableName}_tabela")
+        cols = [d[0] for d in cursor.description][1:]
+        rows = {linha[0]: dict(zip(cols, linha[1:])) for linha in cursor.fetchall()}
+        return cols, rows
+
+    @classmethod
+    def snapshotData(cls, rows: dict, rowName: str, colName: str) -> str:
+        """Equivalente a getData, mas resolvido sobre um snapshot em memória."""
+        return cls.resolveData(rowName, lambda var: rows.get(var, {}).get(colName))
+
+    # ------------------------- metadados (TYPE/BYTE_SIZE) -------------------------
+
+    def primeMeta(self, tableName: str, rows: dict):
+        """Monta o índice de metadados a partir de um snapshot já lido (tableSnapshot)."""
+        self._meta[tableName] = {
+            name: RowMeta.parse(row.get('TYPE'), row.get('BYTE_SIZE'))
+            for name, row in rows.items()
+        }
+
+    def _metaIndex(self, tableName: str) -> dict:
+        index = self._meta.get(tableName)
+        if index is None:
+            try:
+                cursor = self._db.execute(f"SELECT NAME, TYPE, BYTE_SIZE FROM {tableName}_tabela")
+                # TYPE/BYTE_SIZE ainda na fila write-behind prevalecem sobre o banco
+                pending = self._writer.get
+                index = {name: RowMeta.parse(pending((tableName, name, 'TYPE'), t),
+                                             pending((tableName, name, 'BYTE_SIZE'), b))
+                         for name, t, b in cursor.fetchall()}
+            except sqlite3.Error:
+                index = {}
+            self._meta[tableName] = index
+        return index
+
+    def rowMeta(self, tableName: str, rowName: str) -> RowMeta:
+        """Metadados da linha, sem ida ao banco depois da primeira carga da tabela."""
+        index = self._metaIndex(tableName)
+        meta = index.get(rowName)
+        if meta is None:
+            # linha composta ('a | b') ou ainda desconhecida: resolve como getData e memoriza
+            meta = RowMeta.parse(self.getData(tableName, rowName, 'TYPE'),
+                                 self.getData(tableName, rowName, 'BYTE_SIZE'))
+            index[rowName] = meta
+        return meta
+
+    def invalidateMeta(self, tableName: str):
+        self._meta.pop(tableName, None)
+
     def setRawData(self, tableName: str, rowName: str, colName: str, value: str):
+        if colName in ('TYPE', 'BYTE_SIZE'):
+            self.invalidateMeta(tableName)
+        # a escrita síncrona prevalece sobre um valor ainda na fila; sem descarga
+        # concorrente, um lote mais antigo não pode gravar por cima dela
+        with self._writer.exclusive():
+            self._writer.discard((tableName, rowName, colName))
+            try:
+                with self._db.transaction() as cursor:
+                    self._writeCell(cursor, tableName, rowName, colName, value)
+            except Exception as e:
+                self._schema.clear()  # DDL pode ter sofrido rollback
+                print(f"❌ Erro ao atualizar ou inserir no SQLite: {e}")
+
+    def setRawDataMany(self, items: list):
+        """Grava [((tabela, linha, coluna), valor), ...] de forma síncrona numa única transação (tudo ou nada)."""
+        with self._writer.exclusive():
+            for (tableName, rowName, colName), _ in items:
+                if colName in ('TYPE', 'BYTE_SIZE'):
+                    self.invalidateMeta(tableName)
+                self._writer.discard((tableName, rowName, colName))
+            try:
+                self._writeMany(items)
+                return True
+            except Exception as e:
+                print(f"❌ Erro ao atualizar ou inserir no SQLite: {e}")
+                return False
+
+    def queueRawData(self, tableName: str, rowName: str, colName: str, value: str):
+        """Escrita adiada: coalescida em memória e gravada em lote pela fila write-behind."""
+        if colName in ('TYPE', 'BYTE_SIZE'):
+            self.invalidateMeta(tableName)
+        self._writer.put((tableName, rowName, colName), value)
+
+    def flush(self):
+        """Grava imediatamente as escritas adiadas pendentes."""
+        self._writer.flush()
+
+    def _writeMany(self, items: list):
+        """Grava [((tabela, linha, coluna), valor), ...] numa única transação."""
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-
-                # Garante que a tabela exista
-                cursor.execute(f'''
-                    CREATE TABLE IF NOT EXISTS {tableName}_tabela (
-                        NAME TEXT PRIMARY KEY
-                    )
-                ''')
-
-                # Garante que a coluna exista
-                cursor.execute(f"PRAGMA table_info({tableName}_tabela)")
-                columns = [col[1] for col in cursor.fetchall()]
-                if colName not in columns:
-                    cursor.execute(f"ALTER TABLE {tableName}_tabela ADD COLUMN {colName} TEXT")
-
-                # Atualiza ou insere o valor
-                cursor.execute(f"SELECT 1 FROM {tableName}_tabela WHERE NAME = ?", (rowName,))
-                if cursor.fetchone():
-                    cursor.execute(f"UPDATE {tableName}_tabela SET {colName} = ? WHERE NAME = ?", (value, rowName))
-                else:
-                    cursor.execute(f"INSERT INTO {tableName}_tabela (NAME, {colName}) VALUES (?, ?)", (rowName, value))
-
-        except Exception as e:
-            print(f"❌ Erro ao atualizar ou inserir no SQLite: {e}")        
+            with self._db.transaction() as cursor:
+                for (tableName, rowName, colName), value in items:
+                    self._writeCell(cursor, tableName, rowName, colName, value)
+        except Exception:
+            self._schema.clear()  # DDL pode ter sofrido rollback
+            raise
+        # um índice recarregado enquanto o lote estava em trânsito (fora da fila e
+        # ainda não gravado) viu os metadados antigos: descarta depois do commit
+        for tableName in {key[0] for key, _ in items if key[2] in ('TYPE', 'BYTE_SIZE')}:
+            self.invalidateMeta(tableName)
+
+    def _ensureSchema(self, cursor, tableName: str, colName: str):
+        columns = self._schema.get(tableName)
+        if columns is None:
+            # Garante que a tabela exista
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {tableName}_tabela (
+                    NAME TEXT PRIMARY KEY
+                )
+            ''')
+            cursor.execute(f"PRAGMA table_info({tableName}_tabela)")
+            info = cursor.fetchall()
+            columns = {col[1] for col in info}
+            # UPSERT exige NAME único (PK ou índice UNIQUE já existente); tabelas geradas
+            # pelo pandas (to_sql) não têm nenhum dos dois e ficam no UPDATE/INSERT:
+            # o caminho de escrita não altera o esquema do banco do usuário
+            upsert = any(col[1] == 'NAME' and col[5] for col in info)
+            if not upsert:
+                cursor.execute(f"PRAGMA index_list({tableName}_tabela)")
+                for _, indexName, unique, _, partial in cursor.fetchall():
+                    if unique and not partial:
+                        cursor.execute(f"PRAGMA index_info({indexName})")
+                        if [col[2] for col in cursor.fetchall()] == ['NAME']:
+                            upsert = True
+                            break
+            self._upsert[tableName] = upsert
+            self._schema[tableName] = columns
+
+        # Garante que a coluna exista
+        if colName not in columns:
+            cursor.execute(f"ALTER TABLE {tableName}_tabela ADD COLUMN {colName} TEXT")
+            columns.add(colName)
+
+    def _writeCell(self, cursor, tableName: str, rowName: str, colName: str, value: str):
+        self._ensureSchema(cursor, tableName, colName)
+
+        # Atualiza ou insere o valor
+        if self._upsert[tableName]:
+            cursor.execute(f"INSERT INTO {tableName}_tabela (NAME, {colName}) VALUES (?, ?) "
+                           f"ON CONFLICT(NAME) DO UPDATE SET {colName} = excluded.{colName}",
+                           (rowName, value))
+        else:
+            cursor.execute(f"UPDATE {tableName}_tabela SET {colName} = ? WHERE NAME = ?", (value, rowName))
+            if cursor.rowcount == 0:
+                cursor.execute(f"INSERT INTO {tableName}_tabela (NAME, {colName}) VALUES (?, ?)", (rowName, value))
     
     def dataFrame(self, tableName: str):
-        with sqlite3.connect(self.db_name) as conn:
-            df = pd.read_sql_query(f"SELECT * FROM {tableName}_tabela", conn, index_col='NAME')
+        self._writer.flush()
+        df = pd.read_sql_query(f"SELECT * FROM {tableName}_tabela", self._db.conn, index_col='NAME')
         return df
+
+    def close(self):
+        """Grava as escritas pendentes e fecha as conexões (encerramento da aplicação)."""
+        self._writer.close()
+        self._db.close_all()
                                 
 # Exemplo de uso
 if __name__ == '__main__':
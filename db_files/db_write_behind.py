@@ -0,0 +1,110 @@
+import atexit
+import threading
+from contextlib import contextmanager
+
+MISSING = object()
+
+class DBWriteBehind():
+    """
+    Fila de escrita adiada (write-behind) para células do banco.
+
+    - put() custa só uma atualização de dict: escritas repetidas na mesma
+      célula (tabela, linha, coluna) são coalescidas e só a última vai ao banco.
+    - Uma thread de fundo descarrega tudo numa única transação quando a fila
+      atinge `max_pending` células ou a cada `interval_s` segundos.
+    - close()/flush() gravam o que estiver pendente (também chamado no atexit).
+    - get() enxerga o lote em trânsito (já fora da fila, ainda sem commit) até a
+      transação terminar; escritas síncronas feitas dentro de exclusive() não
+      concorrem com uma descarga, então um lote mais antigo nunca as sobrescreve.
+    """
+
+    def __init__(self, write_many, max_pending: int = 256, interval_s: float = 0.5):
+        self._write_many = write_many      # callable(list[((t, r, c), valor)]) -> None
+        self.max_pending = max(1, int(max_pending))
+        self.interval_s = float(interval_s)
+        self._pending: dict[tuple, object] = {}
+        self._inflight: dict[tuple, object] = {}  # lote sendo gravado por flush()
+        self._lock = threading.Lock()        # protege _pending e _inflight
+        self._flush_lock = threading.Lock()  # serializa descargas
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    # ------------------------- API -------------------------
+
+    def put(self, key: tuple, value):
+        with self._lock:
+            self._pending[key] = value
+            full = len(self._pending) >= self.max_pending
+        if self._thread is None:
+            self._start()
+        if full:
+            self._wake.set()
+
+    def get(self, key: tuple, default=MISSING):
+        """Valor ainda não gravado para a célula (leitura consistente com put)."""
+        with self._lock:
+            value = self._pending.get(key, MISSING)
+            if value is MISSING:
+                value = self._inflight.get(key, default)
+            return value
+
+    def discard(self, key: tuple):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    @contextmanager
+    def exclusive(self):
+        """Bloco sem descarga concorrente (para escritas síncronas que devem prevalecer sobre a fila)."""
+        with self._flush_lock:
+            yield
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Grava todas as células pendentes numa única transação."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            try:
+                self._write_many(list(batch.items()))
+            except Exception as e:
+                print(f"[WARN] Write-behind falhou ({len(batch)} células): {e}")
+                # devolve o lote sem sobrescrever valores mais novos
+                with self._lock:
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+            finally:
+                with self._lock:
+                    self._inflight = {}
+
+    def close(self):
+        """Para a thread de fundo e grava o que estiver pendente."""
+        self._stop.set()
+        self._wake.set()
+        t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout=5.0)
+        self._thread = None
+        self.flush()
+
+    # ------------------------- thread -------------------------
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,138 @@
+import time
+from typing import Callable, Optional
+
+# Estados da máquina de montagem
+SYNC, PREAMBLE, HEADER, BODY = range(4)
+
+VALID_FRAME_TYPES = (0x01, 0x02, 0x06)  # burst, request (STX), response (ACK)
+
+
+class HrtFrameAssembler:
+    """
+    Incremental HART frame assembler fed with the raw serial chunks.
+
+    The serial reader may hand over half a frame or several frames glued together;
+    this state machine emits exactly one complete, checksum-valid frame
+    (preamble included) per call of `on_frame`:
+
+        SYNC      waits for the first 0xFF
+        PREAMBLE  counts 0xFF; the first other byte is the delimiter
+                  (bit 7 gives the address length: 1 or 5 bytes,
+                  bits 5-6 the number of expansion bytes: 0 to 3)
+        HEADER    address + expansion bytes + command + byte count
+        BODY      `byte count` data bytes + checksum (XOR from the delimiter on)
+
+    Discarded noise is counted in droppedBytes; a frame with a bad checksum counts
+    in badFrames and the bytes after its delimiter are re-scanned, so a real frame
+    hidden inside garbage is not lost. A partial frame older than `gap_s` is dropped.
+    Frames with expansion bytes are framed correctly but not emitted (HrtFrame does
+    not parse them): they count in unsupportedFrames and are logged.
+    """
+
+    def __init__(self, on_frame: Optional[Callable[[bytes], None]] = None,
+                 min_preamble: int = 2, gap_s: float = 0.1):
+        self.on_frame = on_frame
+        self.min_preamble = min_preamble
+        self.gap_s = gap_s
+        self.frames = 0
+        self.droppedBytes = 0
+        self.badFrames = 0
+        self.unsupportedFrames = 0
+        self._state = SYNC
+        self._nPreamble = 0
+        self._frame = bytearray()
+        self._need = 0
+        self._last = 0.0
+
+    def reset(self):
+        """Discards any partial frame (e.g. when the port is reopened)."""
+        self._state = SYNC
+        self._nPreamble = 0
+        self._frame = bytearray()
+        self._need = 0
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "droppedBytes": self.droppedBytes, "badFrames": self.badFrames,
+                "unsupportedFrames": self.unsupportedFrames}
+
+    def feed(self, data: bytes) -> int:
+        """Consumes a chunk of serial bytes; returns how many frames were emitted."""
+        now = time.monotonic()
+        if self._state != SYNC and now - self._last > self.gap_s:
+            # sobra de um frame interrompido: o que chega agora é outro frame
+            self.badFrames += 1
+            self.droppedBytes += self._nPreamble + len(self._frame)
+            self.reset()
+        self._last = now
+
+        emitted = 0
+        stack = [bytes(data)]
+        while stack:
+            chunk = stack.pop()
+            i, size = 0, len(chunk)
+            while i < size:
+                state = self._state
+                if state == SYNC:
+                    j = chunk.find(b"\xff", i)
+                    if j < 0:
+                        self.droppedBytes += size - i
+                        break
+                    self.droppedBytes += j - i
+                    self._nPreamble = 1
+                    self._state = PREAMBLE
+                    i = j + 1
+                elif state == PREAMBLE:
+                    b = chunk[i]
+                    i += 1
+                    if b == 0xFF:
+                        self._nPreamble += 1
+                    elif self._nPreamble < self.min_preamble or (b & 0x07) not in VALID_FRAME_TYPES:
+                        self.droppedBytes += self._nPreamble + 1
+                        self.reset()
+                    else:
+                        self._frame = bytearray((b,))
+                        # endereço + bytes de expansão + comando + byte count
+                        self._need = (5 if b & 0x80 else 1) + ((b >> 5) & 0x3) + 2
+                        self._state = HEADER
+                else:
+                    # HEADER/BODY: copia de uma vez o que falta da etapa atual
+                    k = min(self._need, size - i)
+                    self._frame += chunk[i:i + k]
+                    self._need -= k
+                    i += k
+                    if self._need:
+                        continue
+                    if state == HEADER:
+                        self._need = self._frame[-1] + 1  # body + checksum
+                        self._state = BODY
+                        continue
+                    replay = self._finish()
+                    if replay is None:
+                        emitted += 1
+                    else:
+                        # reexamina o que veio depois do delimitador, antes do resto do chunk
+                        stack.append(chunk[i:])
+                        stack.append(replay)
+                        break
+        return emitted
+
+    def _finish(self) -> Optional[bytes]:
+        """Validates the checksum; emits the frame or returns the bytes to re-scan."""
+        frame = self._frame
+        checksum = 0
+        for value in memoryview(frame)[:-1]:
+            checksum ^= value
+        nPreamble = self._nPreamble
+        self.reset()
+        if checksum != frame[-1]:
+            self.badFrames += 1
+            self.droppedBytes += nPreamble + 1
+            return bytes(frame[1:])
+        if (frame[0] >> 5) & 0x3:
+            self.unsupportedFrames += 1
+            print(f"[WARN] HART: frame com bytes de expansão descartado: {bytes(frame).hex().upper()}")
+            return None
+        self.frames += 1
+        if self.on_frame:
+            self.on_frame(b"\xff" * nPreamble + bytes(frame))
+        return None
@@ -1,14 +1,16 @@
 import serial
-from typing import List, Optional, Callable
+from typing import List, Optional, Callable, Union
 from conn.comm_serial import CommSerial
+from hrt.hrt_assembler import HrtFrameAssembler
 
 DEFAULT_CFG = {"port":"COM1","baudrate":1200,"bytesize":8,"parity":"N","stopbits":1}
 
 class HrtComm:
-    def __init__(self, port: Optional[str] = None, func_read: Optional[Callable[[str], None]] = None):
+    def __init__(self, port: Optional[str] = None, func_read: Optional[Callable[[bytes], None]] = None):
         self._port: Optional[str] = port
-        self.func_read: Optional[Callable[[str], None]] = func_read
+        self.func_read: Optional[Callable[[bytes], None]] = func_read
         self._comm_serial = CommSerial()
+        self.assembler = HrtFrameAssembler()  # bytes soltos da serial -> um frame completo por callback
         self.connect(port, func_read)
 
     @property
@@ -23,34 +25,33 @@ class HrtComm:
     def available_ports(self) -> List[str]:
         return self._comm_serial.available_ports
 
-    def read_frame(self) -> str:
-        resp = self._comm_serial.read_serial()
-        return "".join([format(e, '02x').upper() for e in resp])
+    def read_frame(self) -> bytes:
+        return self._comm_serial.read_serial()
 
     @property
     def is_connected(self) -> bool:
         return self._comm_serial.is_open
 
-    def write_frame(self, data: str) -> bool:
-        aux = [int(data[i:i + 2], 16) for i in range(0, len(data), 2)]
-        resp = bytes(aux)
-        return self._comm_serial.write_serial(resp)
+    def write_frame(self, data: Union[bytes, str]) -> bool:
+        """Escreve o frame (bytes; string HEX ainda aceita)."""
+        if isinstance(data, str):
+            data = bytes.fromhex(data)
+        return self._comm_serial.write_serial(data)
 
-    def connect(self, port: Optional[str] = None, func_read: Optional[Callable[[str], None]] = None) -> bool:
+    def connect(self, port: Optional[str] = None, func_read: Optional[Callable[[bytes], None]] = None) -> bool:
         func_read_aux = func_read if func_read is not None else self.func_read
         if (port or self._port) is not None:
-            def serial_read_callback(data: List[int]):
-                if func_read_aux:
-                    func_read_aux(
-                        "".join([format(e, '02x').upper() for e in data])
-                    )
+            self.assembler.on_frame = func_read_aux
+            self.assembler.reset()
             return self._comm_serial.open_serial(
                 port or self._port,
                 baudrate=1200,
                 bytesize=8,
                 parity=serial.PARITY_ODD,  # Changed to serial.PARITY_ODD
                 stopbits=serial.STOPBITS_ONE,  # Changed to serial.STOPBITS_ONE
-                func_read=serial_read_callback
+                func_read=self.assembler.feed,
+                reader="event",
+                gap_chars=0,  # o assembler acha o fim do frame pelo byte count: esperar silêncio só atrasa
             )
         else:
             return False
@@ -58,8 +59,8 @@ class HrtComm:
     def disconnect(self) -> bool:
         return self._comm_serial.close_serial()
 
-def handle_data(data):
-    print(f"Received data: {data}")
+def handle_data(data: bytes):
+    print(f"Received data: {data.hex().upper()}")
 
 # Example Usage:
 if __name__ == '__main__':
@@ -71,9 +72,9 @@ if __name__ == '__main__':
         print(f"Trying to connect to {port}")
         if hrt_comm.connect(port=port):
             print("Connected to serial port")
-            frame_to_write = "0102030405"  # Example frame data
+            frame_to_write = bytes.fromhex("0102030405")  # Example frame data
             if hrt_comm.write_frame(frame_to_write):
-                print(f"Wrote frame: {frame_to_write}")
+                print(f"Wrote frame: {frame_to_write.hex().upper()}")
             else:
                 print("Failed to write frame")
             # Data will be printed in handle_data function when received
@@ -1,223 +1,296 @@
-import re
-from typing import Optional
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
 
 
 class HrtFrame:
-    def __init__(self, frame: Optional[str] = None):
+    """
+    HART frame kept as bytes/ints internally.
+    Parsing and building use index arithmetic over the raw bytes; the hex-string
+    properties (frame, delimiter, address, command, body, ...) are produced on demand,
+    only for logging and the UI.
+    """
+
+    def __init__(self, frame: Optional[Union[str, BytesLike]] = None):
         self.log: str = ""
-        self.posIniFrame: int = 0
-        self.preamble: str = "FFFFFFFFFF"
-        self.addressType: bool = False # False - Frame Curto ou True - Frame Longo  
-        self.frameType: str = "02"
+        self.posIniFrame: int = 0  # posição do delimitador no frame, em caracteres hex (2 por byte)
+        self._nPreamble: int = 5
+        self.addressType: bool = False # False - Frame Curto ou True - Frame Longo
+        self._frameType: int = 0x02
         self.masterAddress: bool = True  # 1 - primary master; 0 - secondary master -> Pra quem ele esta mandando
         self.burstMode: bool = False  # 1 - in Burst Mode; 0 - not Burst Mode or Slave
-        self._manufacterId: str = "00"
-        self._deviceType: str = "00"
-        self._deviceId: str = "00"
-        self._pollingAddress: str = "00"
-        self.command: str = "00"
-        self._nBBody: int = 0
-        self._body: str = ""
-        self.checkSum: str = "00"
+        # campos de endereço: None quando incoerentes com addressType (getter devolve "")
+        self._manufacterId: Optional[int] = 0
+        self._deviceType: Optional[int] = 0
+        self._deviceId: Optional[bytes] = b"\x00\x00\x00"
+        self._pollingAddress: Optional[int] = 0
+        self._command: int = 0
+        self._body: bytes = b""
+        self._checkSum: int = 0
 
         if frame is not None:
             self.extractFrame(frame)
 
-    def calcCheckSum(self, ck: str) -> str:
-        """Calculates the checksum of a given string."""
-        hex_values = [int(ck[i:i + 2], 16) for i in range(0, len(ck), 2)]
+    # ------------------------- checksum -------------------------
+
+    @staticmethod
+    def _xor(data: BytesLike) -> int:
         checksum = 0
-        for value in hex_values:
+        for value in data:
             checksum ^= value
-        return hex(checksum)[2:].upper().zfill(2)
+        return checksum
+
+    def calcCheckSum(self, ck: Union[str, BytesLike]) -> str:
+        """Calculates the checksum of a hex string (or bytes)."""
+        if isinstance(ck, str):
+            ck = bytes.fromhex(ck)
+        return f"{self._xor(ck):02X}"
+
+    # ------------------------- frame completo -------------------------
+
+    def toBytes(self) -> bytes:
+        """Returns the complete HART frame as bytes (preamble ... checksum)."""
+        aux = self._partialBytes()
+        return b"\xff" * self._nPreamble + aux + bytes((self._xor(aux),))
 
     @property
     def frame(self) -> str:
         """Returns the complete HART frame as a hexadecimal string."""
         self.log = ""
-        aux = self._pacialFrame()
-        ck = self.calcCheckSum(aux)
-        return f'{self.preamble}{aux}{ck}'.upper()
-
-
-    def _pacialFrame(self) -> str:
-        """Returns the partial frame (delimiter, address, command, nBBody, body) as a hexadecimal string."""
-        return f"{self.delimiter}{self.address}{self.command}{self._nBBody:02X}{self._body}"
+        return self.toBytes().hex().upper()
 
     @frame.setter
-    def frame(self, hrtFrame: str):
-        """Sets the frame by extracting data from a hexadecimal string."""
+    def frame(self, hrtFrame: Union[str, BytesLike]):
+        """Sets the frame by extracting data from a hexadecimal string or bytes."""
         self.log = ""
         self.extractFrame(hrtFrame)
 
-    def extractFrame(self, strFrame: str):
-        """Extracts frame data from a hexadecimal string."""
+    def _partialBytes(self) -> bytes:
+        """Delimiter, address, command, byte count and body (the checksummed part)."""
+        return bytes((self._delimiterByte(),)) + self.addressBytes + bytes((self._command, len(self._body))) + self._body
+
+    def _pacialFrame(self) -> str:
+        """Returns the partial frame (delimiter, address, command, nBBody, body) as a hexadecimal string."""
+        return self._partialBytes().hex().upper()
+
+    def extractFrame(self, frame: Union[str, BytesLike]):
+        """Extracts frame data from bytes (or from a hexadecimal string)."""
         try:
-            # Calcula a posIniFrame
-            listFrame = " ".join([strFrame[i:i + 2] for i in range(0, len(strFrame), 2)])
-            match = re.search(r'FF ([^F][A-F0-9]|[A-F0-9][^F])', listFrame)
-            if match is None:
-                self.log = "Don't find Preamble in Frame"
-                return
-            else:
-                iniFrameAux = match.start()
-                self.posIniFrame = (2 * iniFrameAux + 6) // 3
+            data = memoryview(bytes.fromhex(frame) if isinstance(frame, str) else frame)
+        except ValueError:
+            self.log = "Incorrect hart Frame size"
+            return
+        size = len(data)
+
+        ################## Preamble #######################
+        # primeiro 0xFF e o primeiro byte não-0xFF depois dele (delimitador)
+        start = 0
+        while start < size and data[start] != 0xFF:
+            start += 1
+        pos = start
+        while pos < size and data[pos] == 0xFF:
+            pos += 1
+        if start == size or pos == size:
+            self.log = "Don't find Preamble in Frame"
+            return
+        self.posIniFrame = 2 * pos
+        self._nPreamble = pos - start
 
-            ################## Preamble #######################
-            self.preamble = strFrame[:self.posIniFrame]
+        try:
             ################## Delimiter #######################
-            self.delimiter = strFrame[self.posIniFrame:self.posIniFrame + 2]
-
-            if not self.addressType:
-                ################## Address #######################
-                self.address = strFrame[self.posIniFrame + 2:self.posIniFrame + 4]
-                ################## Command #######################
-                self.command = strFrame[self.posIniFrame + 4:self.posIniFrame + 6]
-                ################## Nbbody e o Body #######################
-                # Extrai o numero de bytes do body [nbbody] e o body
-                self._nBBody = int(strFrame[self.posIniFrame + 6:self.posIniFrame + 8], 16)
-                self._body = strFrame[self.posIniFrame + 8:self.posIniFrame + 8 + 2 * self._nBBody]
-            else:
-                ################## Address #######################
-                self.address = strFrame[self.posIniFrame + 2:self.posIniFrame + 12]
-                ################## Command #######################
-                self.command = strFrame[self.posIniFrame + 12:self.posIniFrame + 14]
-                ################## Nbbody e o Body #######################
-                # Extrai o numero de bytes do body [nbbody] e o body
-                self._nBBody = int(strFrame[self.posIniFrame + 14:self.posIniFrame + 16], 16)
-                self._body = strFrame[self.posIniFrame + 16:self.posIniFrame + 16 + 2 * self._nBBody]
-
+            self._setDelimiterByte(data[pos])
+            ################## Address #######################
+            nAddress = 5 if self.addressType else 1
+            self._setAddressBytes(data[pos + 1:pos + 1 + nAddress])
+            ################## Command #######################
+            pos += 1 + nAddress
+            self._command = data[pos]
+            ################## Nbbody e o Body #######################
+            nBBody = data[pos + 1]
+            end = pos + 2 + nBBody
+            if end >= size:
+                raise IndexError("frame truncado")
+            self._body = bytes(data[pos + 2:end])
             ################## CheckSum #######################
-            # Extrai o CheckSum e checa se ele esta correto.
-            self.checkSum = strFrame[-2:]
-            if self.calcCheckSum(self._pacialFrame()) != self.checkSum:
+            # XOR direto sobre a fatia delimitador..body do próprio frame recebido
+            self._checkSum = data[end]
+            if self._xor(data[self.posIniFrame // 2:end]) != self._checkSum:
                 self.log = "Incorrect CheckSum"
-
-        except Exception as e:
+        except (IndexError, ValueError):
             self.log = "Incorrect hart Frame size"
 
+    # ------------------------- campos -------------------------
+
+    @property
+    def preamble(self) -> str:
+        """Returns the preamble as a hexadecimal string."""
+        return "FF" * self._nPreamble
+
+    @preamble.setter
+    def preamble(self, newPreamble: str):
+        self._nPreamble = len(newPreamble) // 2
+
+    @property
+    def frameType(self) -> str:
+        """Returns the frame type ('02' request, '06' response, '01' burst)."""
+        return f"{self._frameType:02X}"
+
+    @frameType.setter
+    def frameType(self, newFrameType: Union[str, int]):
+        self._frameType = (int(newFrameType, 16) if isinstance(newFrameType, str) else int(newFrameType)) & 0x07
+
+    @property
+    def command(self) -> str:
+        """Returns the command number as a hexadecimal string."""
+        return f"{self._command:02X}"
+
+    @command.setter
+    def command(self, newCommand: Union[str, int]):
+        self._command = (int(newCommand, 16) if isinstance(newCommand, str) else int(newCommand)) & 0xFF
+
+    @property
+    def checkSum(self) -> str:
+        """Returns the checksum read from the last extracted frame."""
+        return f"{self._checkSum:02X}"
+
     @property
     def nBBody(self) -> int:
         """Returns the number of body bytes."""
-        return self._nBBody
+        return len(self._body)
 
     @property
     def body(self) -> str:
         """Returns the body of the frame."""
-        return self._body
+        return self._body.hex().upper()
 
     @body.setter
-    def body(self, newBody: str):
-        """Sets the body of the frame and updates the number of body bytes."""
-        self._nBBody = len(newBody) // 2
-        self._body = newBody
+    def body(self, newBody: Union[str, BytesLike]):
+        """Sets the body of the frame (hex string or bytes); the byte count follows."""
+        if isinstance(newBody, str):
+            if len(newBody) % 2:
+                self.log = "body with an odd number of hex digits"
+                return
+            try:
+                newBody = bytes.fromhex(newBody)
+            except ValueError:
+                self.log = "body is not a hex string"
+                return
+        self._body = bytes(newBody)
+
+    @property
+    def bodyBytes(self) -> bytes:
+        """Returns the body of the frame as bytes."""
+        return self._body
+
+    def _delimiterByte(self) -> int:
+        return (0x80 if self.addressType else 0x00) | (self._frameType & 0x07)
+
+    def _setDelimiterByte(self, value: int):
+        self.addressType = bool(value & 0x80) # False curto ou True Longo
+        self._frameType = value & 0x07 # 02 Request ou 06 Response
 
     @property
     def delimiter(self) -> str:
         """Returns the delimiter of the frame."""
-        value_aux = 0
-        if self.addressType:
-            value_aux = bit_field_set(value_aux, 7, 1)
-        value_aux = bit_field_set(value_aux, 0, 3, int(self.frameType, 16))
-        return f'{value_aux:02X}'
+        return f"{self._delimiterByte():02X}"
 
     @delimiter.setter
     def delimiter(self, newDelimiter: str):
         """Sets the delimiter of the frame and updates the address type and frame type."""
-        valueAux = int(newDelimiter, 16)
-        # Extrai o address type
-        self.addressType = bit_field_get(valueAux, 7, 1) == 1 # False curto ou True Longo
-        # Extrai o frame type
-        self.frameType = f'{bit_field_get(valueAux, 0, 3):02X}' # 02 Request ou 06 Response
+        self._setDelimiterByte(int(newDelimiter, 16))
 
     @property
-    def address(self) -> str:
-        """Returns the address of the frame."""
-        value_aux: int = 0
-        if self.masterAddress:
-            value_aux = bit_field_set(value_aux, 7, 1) # Master (True primário, False secundário)
-        if self.burstMode:
-            value_aux = bit_field_set(value_aux, 6, 1)
+    def addressBytes(self) -> bytes:
+        """Returns the address field as bytes (1 byte short frame, 5 bytes long frame)."""
+        first = (0x80 if self.masterAddress else 0x00) | (0x40 if self.burstMode else 0x00)
+        if not self.addressType:
+            return bytes((first | ((self._pollingAddress or 0) & 0x3F),))
+        return bytes((first | ((self._manufacterId or 0) & 0x3F), self._deviceType or 0)) + (self._deviceId or b"\x00\x00\x00")
+
+    def _setAddressBytes(self, newAddress: BytesLike):
+        first = newAddress[0]
+        # Extrai o master_slave e o Burst Mode
+        self.masterAddress = bool(first & 0x80) # Master (True primário, False secundário)
+        self.burstMode = bool(first & 0x40)
         if not self.addressType:
-            value_aux = bit_field_set(value_aux, 0, 6, int(self.pollingAddress, 16))
-            address_str = f'{value_aux:02X}'
+            # Extrai o polling_address
+            self._pollingAddress = first & 0x3F
+            self._manufacterId = self._deviceType = self._deviceId = None
         else:
-            value_aux = bit_field_set(value_aux, 0, 6, int(self.manufacterId, 16))            
-            address_str = f'{value_aux:02X}{self._deviceType}{self._deviceId}'
-        return address_str
+            if len(newAddress) < 5:
+                raise IndexError("endereço longo truncado")
+            # Extrai o manufacter_id, device type e device id
+            self._pollingAddress = None
+            self._manufacterId = first & 0x3F
+            self._deviceType = newAddress[1]
+            self._deviceId = bytes(newAddress[2:5])
+
+    @property
+    def address(self) -> str:
+        """Returns the address of the frame."""
+        return self.addressBytes.hex().upper()
 
     @address.setter
-    def address(self, newAddress: str):
+    def address(self, newAddress: Union[str, BytesLike]):
         """Sets the address of the frame and updates the master address, burst mode, polling address, manufacturer ID, device type, and device ID."""
-        id_str = newAddress[:2]
-        valueAux = int(id_str, 16)
-        # Extrai o master_slave
-        self.masterAddress = bit_field_get(valueAux, 7, 1) == 1 # Master (True primário, False secundário)
-        # Extrai o Burst Mode
-        self.burstMode = bit_field_get(valueAux, 6, 1) == 1
-            
+        self._setAddressBytes(bytes.fromhex(newAddress) if isinstance(newAddress, str) else newAddress)
+
+    @property
+    def addressKey(self) -> tuple:
+        """Device identity in the address: (polling,) short frame or (manufacturer, device type, device id) long frame."""
         if not self.addressType:
-            # Extrai o polling_address            
-            self._pollingAddress = f'{bit_field_get(valueAux, 0, 6):02X}'
-            self._manufacterId = ""
-            self._deviceType = ""
-            self._deviceId = ""
-        else:
-            # Extrai o manufacter_id
-            self._pollingAddress = ""
-            self._manufacterId = f'{bit_field_get(valueAux, 0, 6):02X}'
-            self._deviceType = newAddress[2:4]
-            self._deviceId = newAddress[4:10]
+            return ((self._pollingAddress or 0) & 0x3F,)
+        return ((self._manufacterId or 0) & 0x3F, self._deviceType or 0, self._deviceId or b"\x00\x00\x00")
 
     @property
     def pollingAddress(self) -> str:
         """Returns the polling address."""
-        return self._pollingAddress
+        return "" if self._pollingAddress is None else f"{self._pollingAddress:02X}"
 
     @pollingAddress.setter
     def pollingAddress(self, newPollingAddress: str):
         """Sets the polling address, ensuring it is coherent with the address type."""
         if not self.addressType and len(newPollingAddress) == 2:
-            self._pollingAddress = newPollingAddress
+            self._pollingAddress = int(newPollingAddress, 16)
         else:
             self.log = "pollingAddress incoerent with addressType"
 
     @property
     def manufacterId(self) -> str:
         """Returns the manufacturer ID."""
-        return self._manufacterId
+        return "" if self._manufacterId is None else f"{self._manufacterId:02X}"
 
     @manufacterId.setter
     def manufacterId(self, newManufacterId: str):
         """Sets the manufacturer ID, ensuring it is coherent with the address type."""
         if self.addressType and len(newManufacterId) == 2:
-            self._manufacterId = newManufacterId
+            self._manufacterId = int(newManufacterId, 16)
         else:
             self.log = "manufacterId incoerent with addressType"
 
     @property
     def deviceType(self) -> str:
         """Returns the device type."""
-        return self._deviceType
+        return "" if self._deviceType is None else f"{self._deviceType:02X}"
 
     @deviceType.setter
     def deviceType(self, newDeviceType: str):
         """Sets the device type, ensuring it is coherent with the address type."""
         if self.addressType and len(newDeviceType) == 2:
-            self._deviceType = newDeviceType
+            self._deviceType = int(newDeviceType, 16)
         else:
             self.log = "deviceType incoerent with addressType"
 
     @property
     def deviceId(self) -> str:
         """Returns the device ID."""
-        return self._deviceId
+        return "" if self._deviceId is None else self._deviceId.hex().upper()
 
     @deviceId.setter
     def deviceId(self, newDeviceId: str):
         """Sets the device ID, ensuring it is coherent with the address type."""
         if self.addressType and len(newDeviceId) == 6:
-            self._deviceId = newDeviceId
+            self._deviceId = bytes.fromhex(newDeviceId)
         else:
             self.log = "deviceId incoerent with addressType"
 
@@ -231,7 +304,7 @@ def bit_field_get(value: int, start_bit: int, length: int) -> int:
 def bit_field_set(value: int, start_bit: int, length: int, new_value: int = 1) -> int:
     """Sets a bit field in an integer value."""
     mask = ((1 << length) - 1) << start_bit
-    value &= ~mask  
+    value &= ~mask
     value |= (new_value << start_bit) & mask  # Set the bits
     return value
 
@@ -250,8 +323,8 @@ if __name__ == '__main__':
     # Print the generated frame
     print("Generated frame:", frame.frame)
 
-    # Create a HrtFrame object from an existing frame string
-    existing_frame = "FFFFFFFFFF021A0102003D"
+    # Create a HrtFrame object from an existing frame (bytes or hex string)
+    existing_frame = bytes.fromhex("FFFFFFFFFF021A0102003D")
     frame2 = HrtFrame(existing_frame)
 
     # Print the extracted properties
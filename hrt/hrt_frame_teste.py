@@ -0,0 +1,130 @@
+# hrt_frame_teste.py
+# ---------------------------------------------------------------------------
+# Verificação do HrtFrame (parsing/montagem sobre bytes) contra um parser de
+# referência em string HEX, com a mesma lógica do HrtFrame antigo.
+# Gera frames curtos e longos aleatórios (parte com checksum corrompido) e
+# compara todas as propriedades públicas; confere ainda a ida e volta
+# bytes -> HrtFrame -> toBytes() e a recusa de body com número ímpar de dígitos.
+#
+# Uso (na raiz do projeto):
+#   python -m hrt.hrt_frame_teste [--frames 2000] [--seed 1]
+# Sai com código 1 se houver divergência.
+# ---------------------------------------------------------------------------
+
+import argparse
+import random
+import sys
+
+from hrt.hrt_frame import HrtFrame
+
+PROPS = ("preamble", "delimiter", "addressType", "frameType", "address", "masterAddress", "burstMode",
+         "pollingAddress", "manufacterId", "deviceType", "deviceId", "command", "nBBody", "body",
+         "checkSum", "log", "posIniFrame", "frame")
+
+
+def xor_hex(hexStr: str) -> str:
+    checksum = 0
+    for i in range(0, len(hexStr), 2):
+        checksum ^= int(hexStr[i:i + 2], 16)
+    return f"{checksum:02X}"
+
+
+def ref_parse(strFrame: str) -> dict:
+    """Parser de referência em string HEX (mesmos campos e logs do HrtFrame antigo)."""
+    pairs = [strFrame[i:i + 2] for i in range(0, len(strFrame), 2)]
+    for i in range(1, len(pairs)):
+        if pairs[i - 1] == "FF" and pairs[i] != "FF":
+            break
+    else:
+        return {"log": "Don't find Preamble in Frame"}
+    pos = 2 * i
+    out = {"posIniFrame": pos, "preamble": strFrame[:pos], "log": ""}
+    delimiter = int(strFrame[pos:pos + 2], 16)
+    out["addressType"] = bool(delimiter & 0x80)
+    out["frameType"] = f"{delimiter & 0x07:02X}"
+    out["delimiter"] = f"{(delimiter & 0x80) | (delimiter & 0x07):02X}"
+    nAddress = 10 if out["addressType"] else 2
+    address = strFrame[pos + 2:pos + 2 + nAddress]
+    first = int(address[:2], 16)
+    out["masterAddress"] = bool(first & 0x80)
+    out["burstMode"] = bool(first & 0x40)
+    if out["addressType"]:
+        out.update(pollingAddress="", manufacterId=f"{first & 0x3F:02X}",
+                   deviceType=address[2:4], deviceId=address[4:10])
+    else:
+        out.update(pollingAddress=f"{first & 0x3F:02X}", manufacterId="", deviceType="", deviceId="")
+    out["address"] = f"{first & 0xC0 | first & 0x3F:02X}" + address[2:]
+    pos += 2 + nAddress
+    out["command"] = strFrame[pos:pos + 2]
+    out["nBBody"] = int(strFrame[pos + 2:pos + 4], 16)
+    out["body"] = strFrame[pos + 4:pos + 4 + 2 * out["nBBody"]]
+    out["checkSum"] = strFrame[-2:]
+    partial = out["delimiter"] + out["address"] + out["command"] + f"{out['nBBody']:02X}" + out["body"]
+    if xor_hex(partial) != out["checkSum"]:
+        out["log"] = "Incorrect CheckSum"
+    out["frame"] = out["preamble"] + partial + xor_hex(partial)
+    return out
+
+
+def random_frame(rng: random.Random) -> tuple[bytes, bool]:
+    """(frame, checksum correto?) curto ou longo, tipo 01/02/06, body de 0 a 40 bytes."""
+    longAddress = rng.random() < 0.5
+    delimiter = (0x80 if longAddress else 0x00) | rng.choice((0x01, 0x02, 0x06))
+    address = bytes(rng.randrange(256) for _ in range(5 if longAddress else 1))
+    body = bytes(rng.randrange(256) for _ in range(rng.randrange(41)))
+    partial = bytes((delimiter,)) + address + bytes((rng.randrange(256), len(body))) + body
+    checksum = 0
+    for value in partial:
+        checksum ^= value
+    ok = rng.random() >= 0.1
+    if not ok:
+        checksum ^= rng.randrange(1, 256)
+    return b"\xff" * rng.randrange(2, 21) + partial + bytes((checksum,)), ok
+
+
+def check_frames(n: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = 0
+    for k in range(n):
+        data, ok = random_frame(rng)
+        expected = ref_parse(data.hex().upper())
+        for source in (data, data.hex().upper()):
+            frame = HrtFrame(source)
+            got = {name: getattr(frame, name) for name in PROPS if name != "frame"}
+            got["frame"] = frame.frame
+            diff = {name: (got[name], expected[name]) for name in PROPS if got[name] != expected[name]}
+            if diff:
+                mismatches += 1
+                print(f"[❌] frame {k} ({type(source).__name__}) {data.hex().upper()}: {diff}")
+            if ok and HrtFrame(source).toBytes() != data:
+                mismatches += 1
+                print(f"[❌] frame {k}: toBytes() não reproduz {data.hex().upper()}")
+    return mismatches
+
+
+def check_body_setter() -> int:
+    frame = HrtFrame()
+    frame.body = "0A1B"
+    frame.body = "0A1"
+    if frame.body != "0A1B" or not frame.log:
+        print(f"[❌] body ímpar aceito: body={frame.body!r} log={frame.log!r}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Confere o HrtFrame contra o parser de referência em HEX.")
+    ap.add_argument("--frames", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    mismatches = check_frames(args.frames, args.seed) + check_body_setter()
+    if mismatches:
+        print(f"[❌] {mismatches} divergências")
+        return 1
+    print(f"[✅] {args.frames} frames (bytes e HEX) idênticos à referência; body ímpar recusado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
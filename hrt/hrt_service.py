@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional
+
+from hrt.hrt_comm import HrtComm
+from hrt.hrt_frame import HrtFrame
+
+
+class LatencyHistogram:
+    """Histograma de latência (frame recebido -> resposta escrita) com faixas fixas em ms."""
+    BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)  # último: > 500 ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.buckets[bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> float:
+        """Limite superior da faixa que contém o percentil p (inf se cair na última)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.BOUNDS_MS + (float("inf"),), self.buckets):
+            seen += n
+            if seen >= rank:
+                return float(bound)
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": dict(zip([f"<={b}" for b in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}"], self.buckets)),
+        }
+
+
+class HrtService:
+    """
+    Atende o mestre HART numa thread própria, fora do laço de eventos do Tk.
+
+    - É dona da porta (HrtComm) e do HrtTransmitter: só a thread de serviço os usa.
+    - O leitor serial só enfileira cada frame montado (com o instante de chegada);
+      a thread de serviço responde e escreve a resposta imediatamente.
+    - Os valueChangedSignal gerados pela resposta (escritas do mestre) são adiados
+      com ReactGraph.deferEmit e entregues depois, via `dispatch` (p.ex.
+      lambda fn: tk.after(0, fn)); sem dispatch, são emitidos na própria thread,
+      já depois da resposta escrita.
+    - A resposta é montada sob ReactGraph.lock, a mesma trava das escritas da UI e
+      do SimulTf: as leituras do comando veem um estado consistente e as escritas
+      do mestre não se intercalam com as da thread do Tk.
+    - Frames que esperaram mais que `max_age_s` são descartados: o mestre já
+      desistiu e uma resposta atrasada só colidiria com a próxima requisição.
+    - latency: {comando: LatencyHistogram} do frame recebido à resposta escrita;
+      stats() junta latência e contadores para consulta (nada é impresso sozinho).
+    """
+
+    def __init__(self, transmitter, comm: Optional[HrtComm] = None,
+                 dispatch: Optional[Callable[[Callable[[], None]], None]] = None,
+                 max_age_s: float = 0.25, log: bool = False):
+        self.transmitter = transmitter
+        self.comm = comm or HrtComm()
+        self.dispatch = dispatch
+        self.max_age_s = max_age_s
+        self.log = log
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.staleFrames = 0
+        self.errors = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # protege latency entre a thread de serviço e consultas
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self.comm.is_connected
+
+    # -------- ciclo de vida --------
+    def start(self, port: Optional[str] = None) -> bool:
+        """Abre a porta e inicia a thread de serviço. Retorna False se a porta não abrir."""
+        self.stop()
+        if port:
+            self.comm.port = port
+        if not self.comm.connect(port=port or None, func_read=self._on_frame):
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hart-service", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self.comm.disconnect()
+        if self._thread is not None:
+            self._stop.set()
+            self._queue.put(None)  # acorda a thread
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._queue = queue.Queue()
+
+    # -------- atendimento --------
+    def _on_frame(self, data: bytes):
+        """Thread do leitor serial: só carimba e enfileira."""
+        self._queue.put((time.perf_counter(), data))
+
+    def _run(self):
+        graph = self.transmitter.rf.graph
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                continue
+            t_rx, data = item
+            if time.perf_counter() - t_rx > self.max_age_s:
+                self.staleFrames += 1
+                continue
+            request = HrtFrame(data)
+            if request.log:
+                self.errors += 1
+                continue
+            changed: list = []
+            try:
+                with graph.deferEmit() as changed:
+                    with graph.lock:
+                        reply = self.transmitter.response(request)
+                    ok = self.comm.write_frame(reply.toBytes())
+            except Exception as e:
+                self.errors += 1
+                print(f"[WARN] HART: falha ao responder {data.hex().upper()}: {e}")
+                if changed:
+                    self._publish(changed)
+                continue
+            ms = (time.perf_counter() - t_rx) * 1e3
+            with self._lock:
+                self.latency.setdefault(request.command, LatencyHistogram()).add(ms)
+            if not ok:
+                self.errors += 1
+            if self.log:
+                print(f"HART {data.hex().upper()} -> {reply.frame} ({ms:.1f} ms)")
+            if changed:
+                self._publish(changed)
+
+    def _publish(self, nodes: list):
+        emit = lambda: self.transmitter.rf.graph.emitAll(nodes)
+        if self.dispatch is None:
+            emit()
+        else:
+            self.dispatch(emit)
+
+    # -------- consulta --------
+    def latencySnapshot(self) -> dict:
+        """{comando: resumo do histograma}."""
+        with self._lock:
+            return {cmd: h.snapshot() for cmd, h in sorted(self.latency.items())}
+
+    def stats(self) -> dict:
+        """Contadores do serviço, do montador de frames e latência por comando."""
+        assembler = getattr(self.comm, "assembler", None)
+        return {
+            "errors": self.errors,
+            "staleFrames": self.staleFrames,
+            "assembler": assembler.stats() if assembler is not None else {},
+            "latency": self.latencySnapshot(),
+        }
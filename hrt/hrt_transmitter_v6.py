@@ -23,6 +23,7 @@ Notas:
 - Literais mínimos de protocolo (ex.: "FA" e "7FC00000") permanecem como HEX literal por design.
 """
 
+import threading
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
@@ -60,6 +61,9 @@ IDENTITY_BLOCK = [
 
 PV_UNIT_AND_VALUE = ["process_variable_unit_code", "PROCESS_VARIABLE"]
 
+# Linhas que definem o endereço de cada device (índice de roteamento de _prime_header)
+IDENTITY_ROWS = ("polling_address", "manufacturer_id", "device_type", "device_id")
+
 
 # ======================================================================================
 # ÚNICO PONTO DE CONFIGURAÇÃO
@@ -313,6 +317,11 @@ class HrtTransmitter:
         self.col = ""
         self._hrt_frame_write: Optional[HrtFrame] = None
         self._compiled = compile_commands(commands or COMMANDS)
+        # Índice de endereços: {HrtFrame.addressKey: coluna}, montado na 1ª requisição e
+        # atualizado quando uma linha de IDENTITY_ROWS muda (sinal ou escrita do mestre)
+        self._index: Optional[Dict[tuple, str]] = None
+        self._colKeys: Dict[str, List[tuple]] = {}
+        self._indexLock = threading.RLock()
 
     # ---------- ReactVar ----------
     def _rv(self, row_key: str) -> ReactVar:
@@ -333,8 +342,11 @@ class HrtTransmitter:
             if default_hex is None:
                 raise KeyError(f"DB missing row '{row_key}'")
             return default_hex
+        return self._hex(self._rv(row_key), row_key, default_hex)
 
-        rv = self._rv(row_key)
+    @staticmethod
+    def _hex(rv: ReactVar, row_key: str, default_hex: Optional[str] = None) -> str:
+        """HEX (machine) do valor atual de uma ReactVar."""
         human_val = getattr(rv, "_value", None)
         out = rv.translate(human_val, rv.type(), rv.byteSize(), DBState.machineValue, DBState.humanValue)
         out = (out or "").strip().upper().replace(" ", "")
@@ -353,6 +365,86 @@ class HrtTransmitter:
             return
         rv = self._rv(row_key)
         rv.setValue(hex_str, stateAtual=DBState.machineValue, isWidgetValueChanged=False)
+        if row_key in IDENTITY_ROWS and self._index is not None:
+            # a emissão do sinal pode estar adiada (HrtService): reindexa já
+            self._reindex(self.col)
+
+    # ---------- Índice de endereços ----------
+    def _columns(self) -> list:
+        return list(self.rf.df[self.table].columns[2:])
+
+    def _keys_of(self, col: str) -> List[tuple]:
+        """Chaves de endereço (curta e longa) de um device; as inválidas ficam de fora."""
+        df = self.rf.df[self.table]
+        ident = {}
+        for row in IDENTITY_ROWS:
+            rv = df.at[row, col] if row in df.index else None
+            ident[row] = self._hex(rv, row, "") if isinstance(rv, ReactVar) else ""
+        keys = []
+        try:
+            if len(ident["polling_address"]) == 2:
+                keys.append((int(ident["polling_address"], 16) & 0x3F,))
+            if (len(ident["manufacturer_id"]) == 2 and len(ident["device_type"]) == 2
+                    and len(ident["device_id"]) == 6):
+                keys.append((int(ident["manufacturer_id"], 16) & 0x3F, int(ident["device_type"], 16),
+                             bytes.fromhex(ident["device_id"])))
+        except ValueError:
+            pass
+        return keys
+
+    def _build_index(self) -> None:
+        """Monta o índice e assina as células de identidade de todos os devices."""
+        with self._indexLock:
+            if self._index is not None:
+                return
+            df = self.rf.df[self.table]
+            index, colKeys = {}, {}
+            for col in self._columns():
+                keys = colKeys[col] = self._keys_of(col)
+                for key in keys:
+                    index.setdefault(key, col)  # como no laço antigo: 1ª coluna vence
+                for row in IDENTITY_ROWS:
+                    rv = df.at[row, col] if row in df.index else None
+                    if isinstance(rv, ReactVar):
+                        rv.valueChangedSignal.connect(self._on_identity_changed)
+            self._colKeys, self._index = colKeys, index
+
+    def _on_identity_changed(self, rv: ReactVar) -> None:
+        self._reindex(rv.colName)
+
+    def _reindex(self, col: str) -> None:
+        """
+        Atualiza só as chaves de um device; colisões seguem a ordem das colunas.
+        Trabalha sobre cópias e troca os dicionários numa atribuição, sem alterar
+        o índice que um lookup() possa estar lendo.
+        """
+        with self._indexLock:
+            if self._index is None or col not in self._colKeys:
+                return
+            index, colKeys = dict(self._index), dict(self._colKeys)
+            columns = self._columns()
+            order = {c: i for i, c in enumerate(columns)}
+            for key in colKeys[col]:
+                if index.get(key) == col:
+                    del index[key]
+                    # outro device com a mesma chave assume o endereço
+                    for other in columns:
+                        if other != col and key in colKeys.get(other, ()):
+                            index[key] = other
+                            break
+            keys = colKeys[col] = self._keys_of(col)
+            for key in keys:
+                owner = index.get(key)
+                if owner is None or order[col] < order.get(owner, len(order)):
+                    index[key] = col
+            self._colKeys, self._index = colKeys, index
+
+    def lookup(self, hrt_frame: HrtFrame) -> Optional[str]:
+        """Coluna (device) endereçada pelo frame, ou None."""
+        with self._indexLock:
+            if self._index is None:
+                self._build_index()
+            return self._index.get(hrt_frame.addressKey)
 
     # ---------- Header ----------
     def _prime_header(self, hrt_frame_read: HrtFrame) -> bool:
@@ -366,19 +458,20 @@ class HrtTransmitter:
         self._hrt_frame_write.masterAddress = hrt_frame_read.masterAddress
         self._hrt_frame_write.burstMode = hrt_frame_read.burstMode
 
-        # procura coluna cujo address bate
-        for self.col in self.rf.df[self.table].columns[2:]:
+        # coluna cujo address bate: consulta O(1) no índice de endereços
+        col = self.lookup(hrt_frame_read)
+        if col is None:
+            # sem device: mantém o comportamento antigo (responde com a última coluna)
+            self.col = self._columns()[-1]
             if self._hrt_frame_write.addressType:
                 self._hrt_frame_write.manufacterId = g("manufacturer_id", "00")
                 self._hrt_frame_write.deviceType = g("device_type", "00")
                 self._hrt_frame_write.deviceId = g("device_id", "000000")
             else:
                 self._hrt_frame_write.pollingAddress = g("polling_address", "00")
-
-            if self._hrt_frame_write.address == hrt_frame_read.address:
-                break
-        else:
             return True
+        self.col = col
+        self._hrt_frame_write.address = hrt_frame_read.addressBytes
 
         # espelha para o DB (se existir)
         try:
@@ -18,6 +18,7 @@ It:
 
 from __future__ import annotations
 import asyncio
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 # --- project imports (expected to exist in your environment) ---
@@ -31,7 +32,7 @@ from utils.dbtablewidget_tk import DBTableWidgetTk
 # usar o seu gerenciador HART (preferível)
 from hrt.hrt_comm import HrtComm
 from hrt.hrt_transmitter_v6 import HrtTransmitter
-from hrt.hrt_frame import HrtFrame
+from hrt.hrt_service import HrtService
 
 import base64
 from io import BytesIO
@@ -102,6 +103,7 @@ class MainWindowTk(ttk.Frame):
 
         master.title("HART/MODBUS – Tk UI")
         master.geometry("1100x650")
+        master.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # garante que o frame ocupa a janela inteira
         self.pack(fill="both", expand=True)
@@ -138,8 +140,10 @@ class MainWindowTk(ttk.Frame):
         # --- Modbus server (thread controller) ---
         print("🔄 Iniciando servidor Modbus...")
         self.servidor_thread = ModbusServer(self.reactFactory)  # não inicia ainda
-        # HART communication
-        self.hart_comm = HrtComm(func_read=self._on_hart_frame)
+        # HART communication: thread dedicada responde ao mestre; a UI recebe as mudanças via after()
+        self.hart_comm = HrtComm()
+        self.hart_service = HrtService(self.HrtTransmitter, self.hart_comm,
+                                       dispatch=lambda fn: self.after(0, fn), log=True)
 
         # --- UI ---
         print("🔄 Configurando UI...")
@@ -201,9 +205,6 @@ class MainWindowTk(ttk.Frame):
         # spacing entre Modbus e HART
         ttk.Separator(top, orient="vertical").pack(side="left", fill="y", padx=10)
 
-        # --- backend HART ---
-        self.hart_comm = HrtComm(func_read=self._on_hart_frame)
-
         # --- variáveis de UI ---
         self.modbus_port_var = tk.StringVar(
             value=self.modbus_port_var.get() if hasattr(self, "modbus_port_var") else "502"
@@ -265,6 +266,18 @@ class MainWindowTk(ttk.Frame):
         self.mbTable.pack(fill="both", expand=True)
 
     # ------------------- Callbacks & helpers -------------------
+    def _on_close(self):
+        """Encerra servidores/simulação e grava as escritas pendentes antes de sair."""
+        try:
+            if self.is_modbus_running:
+                self.servidor_thread.stop()
+            if self.is_hart_running:
+                self.hart_service.stop()
+            self.simulTf.start(False)
+        finally:
+            self.reactFactory.storage.close()
+            self.master.destroy()
+
     def _on_view_change(self):
         isHuman = (self.view_var.get() == "human")
         # espelha nas duas tabelas
@@ -283,16 +296,6 @@ class MainWindowTk(ttk.Frame):
         if ports and not self.hart_com_var.get():
             self.hart_com_var.set(ports[0])
 
-    def _on_hart_frame(self, hex_str: str):
-        def process_on_ui(hrt_comm):
-            print(hex_str)
-            frame_to_write: str = (self.HrtTransmitter.response(HrtFrame(hex_str))).frame
-            if frame_to_write != "" and hrt_comm.write_frame(frame_to_write):
-                print(f"Wrote frame: {frame_to_write}")
-            else:
-                print("Failed to write frame")
-        self.after(0, process_on_ui, self.hart_comm)  # joga para a main thread do Tk
-        
     def _toggle_comm_inputs_hart(self, disable: bool):
         """Habilita/desabilita os controles de entrada durante a conexão."""
         self.btn_start_hart.configure(state="disabled" if disable else "normal")
@@ -351,9 +354,7 @@ class MainWindowTk(ttk.Frame):
         if state:  # === START HART ===
             hart_port = (self.hart_com_var.get() or "").strip()
             try:
-                if hart_port:
-                    self.hart_comm.port = hart_port
-                ok = self.hart_comm.connect(port=hart_port, func_read=self._on_hart_frame)
+                ok = self.hart_service.start(hart_port)
             except Exception as e:
                 ok = False
                 err = str(e)
@@ -382,7 +383,9 @@ class MainWindowTk(ttk.Frame):
         # === STOP HART ===
 
         # Se Modbus estiver rodando → para apenas HART
-        self.hart_comm.disconnect()
+        self.hart_service.stop()
+        if os.environ.get("HART_DEBUG", "0") == "1":
+            print(f"HART: {self.hart_service.stats()}")
 
 
         self.is_hart_running = False
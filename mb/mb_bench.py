@@ -0,0 +1,334 @@
+# mb_bench.py
+# ---------------------------------------------------------------------------
+# Benchmark de carga/latência do ModbusServer.
+# Sobe o servidor no próprio processo (porta efêmera), dispara N clientes
+# assíncronos pymodbus em paralelo com um mix configurável de function codes
+# (FC1/2/3/4/5/6/15/16), tamanho de bloco e proporção de escritas, e relata
+# p50/p95/p99 de latência e requisições por segundo.
+#
+# As escritas regravam o valor atual do próprio endereço, lido pelo contexto
+# servido (mesmo deslocamento de endereço que o pymodbus aplica às requisições),
+# e check_write_back() confere isso antes da carga. Não são
+# exatamente idempotentes (FLOAT volta como float32 e é regravado arredondado),
+# por isso o benchmark roda sobre uma cópia temporária do banco, descartada ao
+# final: o banco do usuário não é alterado.
+#
+# Uso (na raiz do projeto):
+#   python -m mb.mb_bench --clients 8 --duration 10 --mix 3:60,4:20,16:20 --block 10
+#   python -m mb.mb_bench ... --save-baseline mb/bench_baseline.json
+#   python -m mb.mb_bench ... --baseline mb/bench_baseline.json --tolerance 0.2
+# Com --baseline, sai com código 1 se p95/p99 pioraram ou req/s caiu além da tolerância.
+# ---------------------------------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+
+from pymodbus.client import AsyncModbusTcpClient
+
+from db_files.db_storage import DBStorage, get_persistent_db_path
+from react.react_factory import ReactFactory
+from mb.mb_server import ModbusServer
+
+READ_FCS = (1, 2, 3, 4)
+WRITE_FCS = (5, 6, 15, 16)
+SINGLE_FCS = (5, 6)  # escrevem sempre 1 coil/registrador
+
+
+# ===========================
+# Configuração e resultados
+# ===========================
+
+def parse_mix(text: str) -> dict[int, float]:
+    """'3:60,4:20,16:20' -> {3: 60.0, 4: 20.0, 16: 20.0}."""
+    mix = {}
+    for item in text.split(","):
+        fc, _, weight = item.strip().partition(":")
+        fc = int(fc)
+        if fc not in READ_FCS + WRITE_FCS:
+            raise ValueError(f"Function code não suportado: {fc}")
+        mix[fc] = float(weight or 1)
+    return mix
+
+def apply_write_ratio(mix: dict[int, float], ratio: float | None) -> dict[int, float]:
+    """Reescala os pesos para que as escritas somem `ratio` do total (mantendo as proporções internas)."""
+    if ratio is None:
+        return mix
+    reads = {fc: w for fc, w in mix.items() if fc in READ_FCS}
+    writes = {fc: w for fc, w in mix.items() if fc in WRITE_FCS}
+    if ratio > 0 and not writes:
+        writes = {fc: 1.0 for fc in (6, 16)}
+    if ratio < 1 and not reads:
+        reads = {fc: 1.0 for fc in (3, 4)}
+    out = {}
+    for group, share in ((reads, 1.0 - ratio), (writes, ratio)):
+        total = sum(group.values())
+        for fc, w in group.items():
+            if share > 0 and total > 0:
+                out[fc] = share * w / total
+    return out
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentil por posto mais próximo sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+@dataclass
+class Stats:
+    latencies: list = field(default_factory=list)  # segundos
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict:
+        lat = sorted(self.latencies)
+        return {
+            "requests": len(lat),
+            "errors": self.errors,
+            "rps": len(lat) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(lat, 50) * 1e3,
+            "p95_ms": percentile(lat, 95) * 1e3,
+            "p99_ms": percentile(lat, 99) * 1e3,
+        }
+
+
+# ===========================
+# Carga
+# ===========================
+
+class ModbusBench:
+    def __init__(self, server: ModbusServer, port: int, clients: int, mix: dict[int, float],
+                 block: int, start: int, span: int, unit: int, seed: int | None = None):
+        self.server = server
+        self.port = port
+        self.clients = clients
+        self.fcs = list(mix)
+        self.weights = [mix[fc] for fc in self.fcs]
+        self.block = max(1, block)
+        self.start = start
+        self.span = max(span, self.block)
+        self.unit = unit
+        self.rng = random.Random(seed)
+        self.stats: dict[int, Stats] = {fc: Stats() for fc in self.fcs}
+
+    def _address(self, count: int) -> int:
+        return self.start + self.rng.randrange(0, self.span - count + 1)
+
+    def _current_words(self, address: int, count: int) -> list[int]:
+        """Valores que um FC3 em `address` leria (o contexto aplica o deslocamento do pymodbus)."""
+        return self.server.context[self.unit].getValues(3, address, count)
+
+    def _current_bits(self, address: int, count: int) -> list[bool]:
+        return self.server.context[self.unit].getValues(1, address, count)
+
+    async def check_write_back(self) -> list[str]:
+        """Um FC16/FC15 com os valores atuais não pode alterar o FC3/FC1 da mesma faixa."""
+        client = AsyncModbusTcpClient("127.0.0.1", port=self.port)
+        await client.connect()
+        if not client.connected:
+            raise ConnectionError(f"Cliente não conectou em 127.0.0.1:{self.port}")
+        issues = []
+        try:
+            count = min(self.block, self.span)
+            before = (await client.read_holding_registers(self.start, count, slave=self.unit)).registers
+            await client.write_registers(self.start, self._current_words(self.start, count), slave=self.unit)
+            after = (await client.read_holding_registers(self.start, count, slave=self.unit)).registers
+            if after != before:
+                issues.append(f"FC16 {self.start}..{self.start + count - 1}: {before} -> {after}")
+            before = (await client.read_coils(self.start, count, slave=self.unit)).bits[:count]
+            await client.write_coils(self.start, self._current_bits(self.start, count), slave=self.unit)
+            after = (await client.read_coils(self.start, count, slave=self.unit)).bits[:count]
+            if after != before:
+                issues.append(f"FC15 {self.start}..{self.start + count - 1}: {before} -> {after}")
+        finally:
+            client.close()
+        return issues
+
+    async def _request(self, client, fc: int):
+        count = 1 if fc in SINGLE_FCS else self.block
+        address = self._address(count)
+        slave = self.unit
+        if fc == 1:
+            return await client.read_coils(address, count, slave=slave)
+        if fc == 2:
+            return await client.read_discrete_inputs(address, count, slave=slave)
+        if fc == 3:
+            return await client.read_holding_registers(address, count, slave=slave)
+        if fc == 4:
+            return await client.read_input_registers(address, count, slave=slave)
+        if fc == 5:
+            return await client.write_coil(address, self._current_bits(address, 1)[0], slave=slave)
+        if fc == 6:
+            return await client.write_register(address, self._current_words(address, 1)[0], slave=slave)
+        if fc == 15:
+            return await client.write_coils(address, self._current_bits(address, count), slave=slave)
+        return await client.write_registers(address, self._current_words(address, count), slave=slave)
+
+    async def _worker(self, deadline: float, warmup_until: float):
+        client = AsyncModbusTcpClient("127.0.0.1", port=self.port)
+        await client.connect()
+        if not client.connected:
+            raise ConnectionError(f"Cliente não conectou em 127.0.0.1:{self.port}")
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                fc = self.rng.choices(self.fcs, self.weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    rr = await self._request(client, fc)
+                    ok = not rr.isError()
+                except Exception:
+                    ok = False
+                dt = time.perf_counter() - t0
+                if t0 < warmup_until:
+                    continue
+                if ok:
+                    self.stats[fc].latencies.append(dt)
+                else:
+                    self.stats[fc].errors += 1
+        finally:
+            client.close()
+
+    async def run(self, duration: float, warmup: float) -> dict:
+        t0 = time.perf_counter()
+        warmup_until = t0 + warmup
+        deadline = warmup_until + duration
+        await asyncio.gather(*(self._worker(deadline, warmup_until) for _ in range(self.clients)))
+        elapsed = time.perf_counter() - warmup_until
+
+        total = Stats()
+        for s in self.stats.values():
+            total.latencies.extend(s.latencies)
+            total.errors += s.errors
+        return {
+            "total": total.summary(elapsed),
+            "per_fc": {str(fc): s.summary(elapsed) for fc, s in self.stats.items()},
+            "config": {"clients": self.clients, "block": self.block, "duration_s": duration,
+                       "mix": {str(fc): w for fc, w in zip(self.fcs, self.weights)}},
+        }
+
+
+# ===========================
+# Baseline
+# ===========================
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lista de regressões de `result` em relação a `baseline` (vazia se nada piorou além da tolerância)."""
+    issues = []
+    cur, ref = result["total"], baseline["total"]
+    for key in ("p95_ms", "p99_ms"):
+        if ref[key] > 0 and cur[key] > ref[key] * (1 + tolerance):
+            issues.append(f"{key}: {cur[key]:.3f} > {ref[key]:.3f} (+{tolerance:.0%})")
+    if ref["rps"] > 0 and cur["rps"] < ref["rps"] * (1 - tolerance):
+        issues.append(f"rps: {cur['rps']:.1f} < {ref['rps']:.1f} (-{tolerance:.0%})")
+    if cur["errors"] > ref.get("errors", 0):
+        issues.append(f"errors: {cur['errors']} > {ref.get('errors', 0)}")
+    return issues
+
+def copy_db(src: str, dst: str):
+    """Cópia consistente do SQLite (API de backup: inclui o que ainda está no WAL)."""
+    with closing(sqlite3.connect(src)) as source, closing(sqlite3.connect(dst)) as target:
+        source.backup(target)
+
+def free_port() -> int:
+    """Porta TCP livre escolhida pelo SO."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_listening(port: int, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def print_report(result: dict):
+    print(f"{'FC':>5} {'req':>8} {'err':>5} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(result["per_fc"].items()) + [("total", result["total"])]
+    for name, r in rows:
+        print(f"{name:>5} {r['requests']:>8} {r['errors']:>5} {r['rps']:>10.1f} "
+              f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de carga/latência do servidor Modbus TCP.")
+    ap.add_argument("--clients", type=int, default=4, help="clientes assíncronos simultâneos")
+    ap.add_argument("--duration", type=float, default=5.0, help="duração medida (s)")
+    ap.add_argument("--warmup", type=float, default=1.0, help="aquecimento descartado (s)")
+    ap.add_argument("--mix", default="3:70,4:30", help="pesos por FC, ex.: 1:10,3:50,16:40")
+    ap.add_argument("--write-ratio", type=float, default=None, help="fração de escritas (reescala o mix)")
+    ap.add_argument("--block", type=int, default=10, help="coils/registradores por requisição (FC1-4, 15, 16)")
+    ap.add_argument("--start", type=int, default=0, help="primeiro endereço da faixa sorteada")
+    ap.add_argument("--span", type=int, default=100, help="largura da faixa de endereços")
+    ap.add_argument("--unit", type=int, default=1, help="unit ID (coluna de CLP)")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--strict", action="store_true", help="não mapeado => exceção Illegal Data Address")
+    ap.add_argument("--baseline", help="JSON de referência; regressão => código de saída 1")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="tolerância relativa frente ao baseline")
+    ap.add_argument("--save-baseline", help="grava o resultado como novo baseline")
+    ap.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = ap.parse_args(argv)
+
+    mix = apply_write_ratio(parse_mix(args.mix), args.write_ratio)
+    with tempfile.TemporaryDirectory(prefix="mb_bench_") as tmp:
+        # as escritas do benchmark vão para uma cópia do banco, nunca para o original
+        db_copy = os.path.join(tmp, "banco.db")
+        copy_db(get_persistent_db_path("db/banco.db", "processSimul"), db_copy)
+        storage = DBStorage(db_copy, persistent=False)
+        rf = asyncio.run(ReactFactory.create(["HART", "MODBUS"], storage=storage))
+        server = ModbusServer(rf, strict=args.strict)
+        port = free_port()
+        server.start(port=port)
+        try:
+            if not wait_listening(port):
+                print(f"Servidor não respondeu na porta {port}.", file=sys.stderr)
+                return 2
+            bench = ModbusBench(server, port, args.clients, mix, args.block,
+                                args.start, args.span, args.unit, args.seed)
+            issues = asyncio.run(bench.check_write_back())
+            if issues:
+                print("Regravação altera os valores lidos:\n  " + "\n  ".join(issues), file=sys.stderr)
+                return 2
+            result = asyncio.run(bench.run(args.duration, args.warmup))
+        finally:
+            server.stop()
+            storage.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline gravado em {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        issues = compare(result, baseline, args.tolerance)
+        if issues:
+            print("REGRESSÃO frente ao baseline:\n  " + "\n  ".join(issues), file=sys.stderr)
+            return 1
+        print("Sem regressão frente ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# mb_codec.py
+# ---------------------------------------------------------------------------
+# Codec de words Modbus com struct.Struct pré-compilados.
+# Mesmo layout de BinaryPayloadBuilder/BinaryPayloadDecoder (pymodbus) para
+# um par (byteorder, wordorder), sem alocar builder/decoder a cada acesso:
+#   - o valor é empacotado em ordem de rede (big-endian) e dividido em words;
+#   - wordorder Little inverte a ordem das words (valores de 32 bits);
+#   - byteorder Little troca os bytes dentro de cada word.
+# ---------------------------------------------------------------------------
+
+import struct
+
+from pymodbus.constants import Endian
+
+_F32 = struct.Struct(">f")
+_I32 = struct.Struct(">i")
+_U32 = struct.Struct(">I")
+_I16 = struct.Struct(">h")
+_U16 = struct.Struct(">H")
+
+
+def _swap16(w: int) -> int:
+    return ((w & 0xFF) << 8) | ((w >> 8) & 0xFF)
+
+
+class WordCodec:
+    """Conversões valor <-> registradores de 16 bits segundo byteorder/wordorder."""
+
+    def __init__(self, byteorder=Endian.Big, wordorder=Endian.Big):
+        self.byteorder = byteorder
+        self.wordorder = wordorder
+        self._swap_words = wordorder == Endian.Little
+        self._swap_bytes = byteorder == Endian.Little
+        # separa/junta 2 words já com a troca de bytes embutida no formato
+        self._w2 = struct.Struct(("<" if self._swap_bytes else ">") + "2H")
+
+    # ---- 32 bits ----
+
+    def _split32(self, raw: bytes) -> list[int]:
+        w0, w1 = self._w2.unpack(raw)
+        return [w1, w0] if self._swap_words else [w0, w1]
+
+    def _join32(self, w0: int, w1: int) -> bytes:
+        if self._swap_words:
+            w0, w1 = w1, w0
+        return self._w2.pack(w0 & 0xFFFF, w1 & 0xFFFF)
+
+    def encode_float32(self, value: float) -> list[int]:
+        return self._split32(_F32.pack(float(value)))
+
+    def decode_float32(self, w0: int, w1: int) -> float:
+        return _F32.unpack(self._join32(w0, w1))[0]
+
+    def encode_int32(self, value: int) -> list[int]:
+        return self._split32(_I32.pack(int(value)))
+
+    def decode_int32(self, w0: int, w1: int) -> int:
+        return _I32.unpack(self._join32(w0, w1))[0]
+
+    def encode_uint32(self, value: int) -> list[int]:
+        return self._split32(_U32.pack(int(value) & 0xFFFFFFFF))
+
+    def decode_uint32(self, w0: int, w1: int) -> int:
+        return _U32.unpack(self._join32(w0, w1))[0]
+
+    # ---- 16 bits ----
+
+    def encode_uint16(self, value: int) -> int:
+        w = int(value) & 0xFFFF
+        return _swap16(w) if self._swap_bytes else w
+
+    def decode_uint16(self, word: int) -> int:
+        w = int(word) & 0xFFFF
+        return _swap16(w) if self._swap_bytes else w
+
+    def encode_int16(self, value: int) -> int:
+        return self.encode_uint16(value)  # complemento de 2 em 16 bits
+
+    def decode_int16(self, word: int) -> int:
+        return _I16.unpack(_U16.pack(self.decode_uint16(word)))[0]
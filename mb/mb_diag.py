@@ -0,0 +1,113 @@
+# mb_diag.py
+# ---------------------------------------------------------------------------
+# Diagnóstico dos blocos Modbus sem log por endereço no caminho quente.
+# Cada ocorrência (acesso a endereço não mapeado, low-word de FLOAT,
+# destino não-BOOL, ...) só incrementa contadores por (unit, área, tipo, endereço).
+# O log é agregado: no máximo um resumo a cada `interval_s` segundos.
+# Os contadores por endereço são limitados (`max_entries`): um cliente varrendo
+# o espaço de endereços não faz a memória crescer sem limite.
+# ---------------------------------------------------------------------------
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+logger = logging.getLogger("modbus")
+
+# Tipos de ocorrência
+UNMAPPED = "unmapped"                # leitura ou escrita em endereço sem mapeamento (validate)
+WRITE_LOW_WORD = "write_low_word"    # escrita desalinhada na low-word de FLOAT
+WRITE_NOT_BOOL = "write_not_bool"    # escrita de coil em destino não-BOOL
+WRITE_READ_ONLY = "write_read_only"  # escrita em IR/DI
+WRITE_TRUNCATED = "write_truncated"  # FLOAT com só 1 word restante no pedido
+WRITE_INVALID = "write_invalid"      # FLOAT NaN/Inf
+
+OTHER = None  # endereço das ocorrências agregadas depois que max_entries foi atingido
+
+
+class BlockDiagnostics:
+    """Contadores por endereço das ocorrências dos blocos Modbus, com resumo de log limitado no tempo."""
+
+    def __init__(self, interval_s: float = 10.0, max_entries: int = 4096):
+        self.interval_s = float(interval_s)
+        self.max_entries = max(1, int(max_entries))
+        # {(unit, point, kind, addr): n} desde o último reset; endereços novos além de
+        # max_entries somam em (unit, point, kind, OTHER)
+        self._counts: Counter = Counter()
+        self._pending: Counter = Counter()  # {(unit, point, kind): n} desde o último resumo
+        self._spans: dict = {}              # {(unit, point, kind): [menor addr, maior addr]} idem
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+
+    def note(self, unit: int, point: str, kind: str, addrs: Iterable[int]) -> None:
+        """Registra uma ocorrência para cada endereço de `addrs`."""
+        key = (unit, point, kind)
+        with self._lock:
+            n = 0
+            span = self._spans.get(key)
+            counts = self._counts
+            for addr in addrs:
+                k = (unit, point, kind, addr)
+                if k not in counts and len(counts) >= self.max_entries:
+                    k = (unit, point, kind, OTHER)
+                counts[k] += 1
+                if span is None:
+                    span = self._spans[key] = [addr, addr]
+                elif addr < span[0]:
+                    span[0] = addr
+                elif addr > span[1]:
+                    span[1] = addr
+                n += 1
+            if not n:
+                return
+            self._pending[key] += n
+            due = time.monotonic() - self._last >= self.interval_s
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Emite agora o resumo pendente (se houver) e reinicia a janela."""
+        with self._lock:
+            pending, spans = self._pending, self._spans
+            self._pending, self._spans = Counter(), {}
+            elapsed = time.monotonic() - self._last
+            self._last = time.monotonic()
+        if not pending:
+            return
+        parts = []
+        for (unit, point, kind), n in sorted(pending.items()):
+            lo, hi = spans[(unit, point, kind)]
+            where = f"{lo}" if lo == hi else f"{lo}..{hi}"
+            parts.append(f"unit {unit} {point.upper()} {kind} x{n} (end. {where})")
+        logger.warning(f"Modbus: {sum(pending.values())} ocorrências em {elapsed:.1f} s – " + "; ".join(parts))
+
+    # -------- consulta --------
+
+    def counts(self, unit: Optional[int] = None, point: Optional[str] = None,
+               kind: Optional[str] = None) -> dict:
+        """{(unit, point, kind, addr): n} filtrado pelos argumentos não-None (addr OTHER = excedente)."""
+        with self._lock:
+            return {
+                k: n for k, n in self._counts.items()
+                if (unit is None or k[0] == unit)
+                and (point is None or k[1] == point)
+                and (kind is None or k[2] == kind)
+            }
+
+    def total(self, unit: Optional[int] = None, point: Optional[str] = None,
+              kind: Optional[str] = None) -> int:
+        return sum(self.counts(unit, point, kind).values())
+
+    def top(self, n: int = 10) -> list:
+        """Os `n` (unit, point, kind, addr) mais frequentes, com a contagem."""
+        with self._lock:
+            return self._counts.most_common(n)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._pending.clear()
+            self._spans.clear()
+            self._last = time.monotonic()
@@ -9,6 +9,7 @@ import threading
 import logging
 import struct
 import time
+from array import array
 from dataclasses import dataclass
 from typing import Dict, Optional, Any
 
@@ -19,11 +20,14 @@ from pymodbus.datastore import (
     ModbusSequentialDataBlock as SequentialBlockBase,
 )
 from pymodbus.device import ModbusDeviceIdentification
-from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
 from pymodbus.constants import Endian
 
-from react.react_var import ReactVar
+from react.react_var import ReactVar, META_COLS
 from react.react_factory import ReactFactory
+from mb.mb_codec import WordCodec
+from mb.mb_diag import (
+    BlockDiagnostics, UNMAPPED, WRITE_LOW_WORD, WRITE_NOT_BOOL, WRITE_READ_ONLY, WRITE_TRUNCATED, WRITE_INVALID,
+)
 
 # ===========================
 # Configuração e Logging
@@ -39,6 +43,7 @@ logger.setLevel(logging.INFO)
 # Endianness global do projeto (BB por padrão).
 BYTEORDER = Endian.Big
 WORDORDER = Endian.Big
+CODEC = WordCodec(byteorder=BYTEORDER, wordorder=WORDORDER)
 
 
 # ===========================
@@ -59,9 +64,7 @@ def is_bool_type(rv: ReactVar) -> bool:
 
 def read_float_words(value: float) -> list[int]:
     """FLOAT -> [hi, lo] segundo BYTEORDER/WORDORDER."""
-    b = BinaryPayloadBuilder(byteorder=BYTEORDER, wordorder=WORDORDER)
-    b.add_32bit_float(float(value))
-    return b.to_registers()
+    return CODEC.encode_float32(value)
 
 def try_get_value(rv: ReactVar, default):
     """Leitura segura de rv._value."""
@@ -70,13 +73,6 @@ def try_get_value(rv: ReactVar, default):
     except Exception:
         return default
 
-def decode_skip_word(decoder: BinaryPayloadDecoder) -> None:
-    """Consome 1 word para manter alinhamento do decoder."""
-    try:
-        _ = decoder.decode_16bit_uint()
-    except Exception:
-        pass
-
 def to_int_addr(addr_raw) -> Optional[int]:
     """Converte ADDRESS (string '00' ou ReactVar._value) em int."""
     try:
@@ -178,161 +174,373 @@ class MappingEntry:
 
 class MappingService:
     """
-    Constrói caches O(1) para HR/IR/CO/DI.
+    Constrói caches O(1) para HR/IR/CO/DI de cada unit ID.
     Para FLOAT em HR/IR, mapeia também a low-word (addr+1) via is_low_word=True.
+
+    Cada coluna de CLP da tabela MODBUS (toda coluna que não é metadado: CLP100,
+    CLP200, ...) vira um unit ID (1, 2, ... na ordem das colunas). ADDRESS,
+    MB_POINT e TYPE são da linha, então o layout é o mesmo em todos os units.
+
+    Mantém ainda uma imagem viva de cada área por unit: array('H') para HR/IR e
+    bytearray (1 byte por bit) para CO/DI, atualizada só quando uma ReactVar
+    mapeada emite valueChangedSignal. Leituras FC1-FC4 viram um slice da imagem.
+
+    Edições de ADDRESS, MB_POINT ou TYPE feitas com o servidor rodando remapeiam
+    só a linha afetada (patch_row), sem reconstruir tudo.
+
+    Ao lado de cada imagem há uma máscara (bytearray, 1 = endereço mapeado) que
+    responde unmapped()/validate() com um slice, e um BlockDiagnostics (diag) que
+    conta as ocorrências anômalas por endereço em vez de logar cada uma.
+
+    Tabelas, imagens e máscaras são compartilhadas entre a thread do servidor
+    (leituras/escritas dos blocos), a UI (patch_row) e quem altera valores
+    (refresh): todo acesso passa por `lock`. patch_row monta cópias das áreas
+    tocadas e as troca de uma vez sob o lock.
     """
+    POINTS = ("hr", "ir", "co", "di")
+    META_WATCH = ("ADDRESS", "MB_POINT", "TYPE")  # edições nestas colunas remapeiam a linha
+
     def __init__(self, react_factory: ReactFactory):
         self.rf = react_factory
-        self.hr: Dict[int, MappingEntry] = {}
-        self.ir: Dict[int, MappingEntry] = {}
-        self.co: Dict[int, MappingEntry] = {}
-        self.di: Dict[int, MappingEntry] = {}
+        self.units: Dict[int, str] = {}                              # {unit: coluna}
+        self.tables: Dict[int, Dict[str, Dict[int, MappingEntry]]] = {}  # {unit: {point: {addr: entry}}}
+        self.images: Dict[int, Dict[str, Any]] = {}                  # {unit: {point: imagem}}
+        self.masks: Dict[int, Dict[str, bytearray]] = {}             # {unit: {point: 1 se mapeado}}
+        self.diag = BlockDiagnostics()
+        self._watch: Dict[ReactVar, list] = {}  # {rv: [(unit, point, addr, dtype), ...]}
+        self._rows: Dict[str, list] = {}        # {linha: [(unit, point, addr, entry), ...]}
+        self._metaVars: list = []               # ReactVar de ADDRESS/MB_POINT/TYPE assinadas
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def plc_columns(df) -> list[str]:
+        """Colunas de CLP da tabela MODBUS (as que não são metadados)."""
+        return [col for col in df.columns if col not in META_COLS]
 
     def rebuild(self) -> None:
-        """Reconstrói todos os caches a partir de df['MODBUS']."""
-        self.hr.clear(); self.ir.clear(); self.co.clear(); self.di.clear()
-
+        """Reconstrói caches e imagens de todos os unit IDs numa única varredura por coluna de df['MODBUS']."""
+        self.detach()
         df = self.rf.df.get("MODBUS")
         if df is None:
             logger.warning("DF 'MODBUS' ausente – caches vazios.")
+            with self.lock:
+                self.units, self.tables, self.images, self.masks, self._rows = {}, {}, {}, {}, {}
             return
 
-        for _, row in df.iterrows():
-            try:
-                addr = to_int_addr(row.get("ADDRESS"))
-                if addr is None:
-                    continue
-                point = to_point_str(row.get("MB_POINT"))
-                rv = row.get("CLP100")
-                if not isinstance(rv, ReactVar):
-                    continue
-                dtype = safe_type(rv)
-            except Exception:
+        columns = self.plc_columns(df)
+        units = {unit: col for unit, col in enumerate(columns, start=1)}
+        tables = {unit: {point: {} for point in self.POINTS} for unit in units}
+        rows: Dict[str, list] = {}
+
+        # Varredura direta por coluna (sem iterrows): uma lista por coluna, indexada pela linha
+        nrows = len(df.index)
+        meta = {col: df[col].tolist() if col in df.columns else [None] * nrows for col in self.META_WATCH}
+        cells = [df[col].tolist() for col in columns]
+        for i, row in enumerate(df.index):
+            entries = self._row_entries(meta["ADDRESS"][i], meta["MB_POINT"][i], [c[i] for c in cells])
+            rows[row] = entries
+            for unit, point, addr, entry in entries:
+                tables[unit][point][addr] = entry  # linha posterior prevalece em endereço repetido
+
+        with self.lock:
+            self.units, self.tables, self._rows = units, tables, rows
+            self._build_images()
+        for col in self.META_WATCH:
+            for rv in meta[col]:
+                if isinstance(rv, ReactVar):
+                    rv.valueChangedSignal.connect(self._on_meta_changed)
+                    self._metaVars.append(rv)
+        logger.info("Mapeamento Modbus: " + ", ".join(f"unit {u} = {c}" for u, c in units.items()))
+
+    def _row_entries(self, addr_raw, point_raw, cells: list) -> list:
+        """Entradas (unit, point, addr, MappingEntry) de uma linha; [] se a linha não é mapeável."""
+        addr = to_int_addr(addr_raw)
+        if addr is None:
+            return []
+        point = to_point_str(point_raw)
+        if point not in self.POINTS or not cells or not isinstance(cells[0], ReactVar):
+            return []
+        try:
+            dtype = safe_type(cells[0])  # TYPE é da linha: vale para todos os units
+        except Exception:
+            return []
+
+        if point in ("hr", "ir") and dtype not in ("FLOAT", "INTEGER", "UNSIGNED"):
+            return []  # Tipo não suportado para registrador => ignora mapeamento
+        if point in ("co", "di") and dtype not in ("BOOL", "BOOLEAN"):
+            return []
+
+        entries = []
+        for unit, rv in enumerate(cells, start=1):
+            if not isinstance(rv, ReactVar):
                 continue
+            if dtype == "FLOAT":
+                entries.append((unit, point, addr, MappingEntry(dtype="FLOAT", rv=rv, is_low_word=False)))
+                entries.append((unit, point, addr + 1, MappingEntry(dtype="FLOAT", rv=rv, is_low_word=True)))
+            elif point in ("hr", "ir"):
+                entries.append((unit, point, addr, MappingEntry(dtype=dtype, rv=rv, is_low_word=False)))
+            else:
+                entries.append((unit, point, addr, MappingEntry(dtype="BOOL", rv=rv, is_low_word=False)))
+        return entries
 
-            if point in ("hr", "ir"):
-                # Registradores
-                if dtype == "FLOAT":
-                    base = MappingEntry(dtype="FLOAT", rv=rv, is_low_word=False)
-                    low  = MappingEntry(dtype="FLOAT", rv=rv, is_low_word=True)
-                    if point == "hr":
-                        self.hr[addr] = base
-                        self.hr[addr + 1] = low
-                    else:
-                        self.ir[addr] = base
-                        self.ir[addr + 1] = low
-                elif dtype in ("INTEGER", "UNSIGNED"):
-                    entry = MappingEntry(dtype=dtype, rv=rv, is_low_word=False)
-                    (self.hr if point == "hr" else self.ir)[addr] = entry
-                else:
-                    # Tipo não suportado para registrador => ignora mapeamento
-                    continue
-
-            elif point in ("co", "di"):
-                # Bits
-                if is_bool_type(rv):
-                    entry = MappingEntry(dtype="BOOL", rv=rv, is_low_word=False)
-                    (self.co if point == "co" else self.di)[addr] = entry
-                else:
-                    continue
+    # -------- atualização incremental (edições de ADDRESS/MB_POINT/TYPE) --------
 
-    # Lookups
-    def lookup_hr(self, addr: int) -> Optional[MappingEntry]:
-        return self.hr.get(addr)
+    def _on_meta_changed(self, rv: ReactVar) -> None:
+        self.patch_row(rv.rowName)
 
-    def lookup_ir(self, addr: int) -> Optional[MappingEntry]:
-        return self.ir.get(addr)
+    def patch_row(self, row: str) -> None:
+        """
+        Remapeia só uma linha da tabela MODBUS (após edição de ADDRESS, MB_POINT ou TYPE),
+        sem parar o servidor: retira as entradas antigas da linha, reinstala as que ela
+        encobria e aplica as novas. As áreas tocadas são montadas em cópias e trocadas
+        de uma vez sob o lock, junto com as assinaturas.
+        """
+        df = self.rf.df.get("MODBUS")
+        if df is None or row not in df.index or not self.units:
+            return
+        new = self._row_entries(
+            df.at[row, "ADDRESS"] if "ADDRESS" in df.columns else None,
+            df.at[row, "MB_POINT"] if "MB_POINT" in df.columns else None,
+            [df.at[row, col] for col in self.units.values()],
+        )
 
-    def lookup_co(self, addr: int) -> Optional[MappingEntry]:
-        return self.co.get(addr)
+        with self.lock:
+            old = self._rows.get(row, [])
+            areas: Dict[tuple, tuple] = {}  # {(unit, point): (tabela, imagem, máscara)} copiadas
+            watch = dict(self._watch)
+            released, installed = [], []
+
+            def area(unit: int, point: str) -> tuple:
+                copy = areas.get((unit, point))
+                if copy is None:
+                    copy = areas[(unit, point)] = (dict(self.tables[unit][point]),
+                                                   self.images[unit][point][:],
+                                                   bytearray(self.masks[unit][point]))
+                return copy
+
+            # 1) retira as entradas antigas (só onde ainda são desta linha) e as assinaturas
+            freed = set()
+            for unit, point, addr, entry in old:
+                table, img, mask = area(unit, point)
+                if table.get(addr) is entry:
+                    del table[addr]
+                    mask[addr] = 0
+                    img[addr] = 0
+                    freed.add((unit, point, addr))
+                if watch.pop(entry.rv, None) is not None:
+                    released.append(entry.rv)
+
+            # 2) endereços liberados podem estar reivindicados por outra linha: reinstala
+            if freed:
+                for other, entries in self._rows.items():
+                    if other == row:
+                        continue
+                    for unit, point, addr, entry in entries:
+                        if (unit, point, addr) in freed:
+                            self._install(area(unit, point), watch, unit, point, addr, entry)
+                            installed.append(entry.rv)
+
+            # 3) aplica as entradas novas
+            for unit, point, addr, entry in new:
+                self._install(area(unit, point), watch, unit, point, addr, entry)
+                installed.append(entry.rv)
+
+            # 4) valores atuais nas cópias e troca
+            for rv in dict.fromkeys(installed):
+                for unit, point, addr, dtype in watch.get(rv, ()):
+                    table, img, _ = areas[(unit, point)]
+                    self._encode(img, table, rv, unit, point, addr, dtype)
+            for rv in dict.fromkeys(installed):
+                if rv in watch:
+                    rv.valueChangedSignal.connect(self._on_value_changed)
+            for (unit, point), (table, img, mask) in areas.items():
+                self.tables[unit][point] = table
+                self.images[unit][point] = img
+                self.masks[unit][point] = mask
+            self._watch = watch
+            self._rows[row] = new
+        for rv in released:
+            if rv not in watch:
+                rv.valueChangedSignal.disconnect(self._on_value_changed)
+        logger.info(f"Mapeamento Modbus: linha {row} remapeada ({len(new)} entradas)")
+
+    @staticmethod
+    def _install(area: tuple, watch: dict, unit: int, point: str, addr: int, entry: MappingEntry) -> None:
+        """Coloca uma entrada na cópia da área (cresce imagem/máscara se preciso) e em `watch`."""
+        table, img, mask = area
+        table[addr] = entry
+        if addr >= len(img):
+            grow = addr + 1 - len(img)
+            img.extend(array("H", bytes(2 * grow)) if point in ("hr", "ir") else bytes(grow))
+            mask.extend(bytes(grow))
+        mask[addr] = 1
+        if not entry.is_low_word:
+            targets = list(watch.get(entry.rv, ()))  # a lista vigente pode estar em uso
+            key = (unit, point, addr, entry.dtype)
+            if key not in targets:
+                targets.append(key)
+            watch[entry.rv] = targets
 
-    def lookup_di(self, addr: int) -> Optional[MappingEntry]:
-        return self.di.get(addr)
+    # Lookups
+    def lookup(self, point: str, addr: int, unit: int = 1) -> Optional[MappingEntry]:
+        tables = self.tables.get(unit)
+        return tables[point].get(addr) if tables else None
+
+    def lookup_hr(self, addr: int, unit: int = 1) -> Optional[MappingEntry]:
+        return self.lookup("hr", addr, unit)
+
+    def lookup_ir(self, addr: int, unit: int = 1) -> Optional[MappingEntry]:
+        return self.lookup("ir", addr, unit)
+
+    def lookup_co(self, addr: int, unit: int = 1) -> Optional[MappingEntry]:
+        return self.lookup("co", addr, unit)
+
+    def lookup_di(self, addr: int, unit: int = 1) -> Optional[MappingEntry]:
+        return self.lookup("di", addr, unit)
+
+    # -------- imagens de registradores/bits --------
+
+    def _build_images(self) -> None:
+        """Aloca as imagens, assina as ReactVar mapeadas e preenche os valores atuais."""
+        images, masks = {}, {}
+        watch: Dict[ReactVar, list] = {}
+        for unit, tables in self.tables.items():
+            images[unit], masks[unit] = {}, {}
+            for point, table in tables.items():
+                size = max(table) + 1 if table else 0
+                images[unit][point] = array("H", bytes(2 * size)) if point in ("hr", "ir") else bytearray(size)
+                mask = masks[unit][point] = bytearray(size)
+                for addr, entry in table.items():
+                    mask[addr] = 1
+                    if not entry.is_low_word:
+                        watch.setdefault(entry.rv, []).append((unit, point, addr, entry.dtype))
+        self.images, self.masks = images, masks
+        self._watch = watch
+        for rv in watch:
+            rv.valueChangedSignal.connect(self._on_value_changed)
+            self.refresh(rv)
+
+    def detach(self) -> None:
+        """Cancela as assinaturas de valueChangedSignal (valores e metadados)."""
+        with self.lock:
+            watch, metaVars = self._watch, self._metaVars
+            self._watch = {}
+            self._metaVars = []
+        for rv in watch:
+            rv.valueChangedSignal.disconnect(self._on_value_changed)
+        for rv in metaVars:
+            rv.valueChangedSignal.disconnect(self._on_meta_changed)
+
+    def _on_value_changed(self, rv: ReactVar) -> None:
+        self.refresh(rv)
+
+    def refresh(self, rv: ReactVar) -> None:
+        """Recalcula na imagem as words/bits de uma ReactVar mapeada."""
+        with self.lock:
+            for unit, point, addr, dtype in self._watch.get(rv, ()):
+                self._encode(self.images[unit][point], self.tables[unit][point], rv, unit, point, addr, dtype)
+
+    @staticmethod
+    def _encode(img, table: dict, rv: ReactVar, unit: int, point: str, addr: int, dtype: str) -> None:
+        """Escreve em `img` as words/bits de uma ReactVar num endereço."""
+        try:
+            if dtype == "BOOL":
+                img[addr] = 1 if coerce_to_bool(try_get_value(rv, False)) else 0
+            elif dtype == "FLOAT":
+                words = read_float_words(float(try_get_value(rv, 0.0)))  # [hi, lo] segundo config
+                low = table.get(addr + 1)
+                if low is not None and low.rv is rv and low.is_low_word:
+                    img[addr:addr + 2] = array("H", words)  # atualiza as 2 words de uma vez
+                else:
+                    img[addr] = words[0]
+            elif dtype == "INTEGER":
+                img[addr] = CODEC.encode_int16(u16(int(try_get_value(rv, 0))))
+            else:  # UNSIGNED
+                img[addr] = CODEC.encode_uint16(int(try_get_value(rv, 0)))
+        except Exception as e:
+            logger.error(f"Erro ao atualizar imagem {point.upper()} {addr:02} (unit {unit}): {e}")
+
+    def unmapped(self, point: str, address: int, count: int, unit: int = 1) -> list[int]:
+        """Endereços sem mapeamento em [address, address+count) ([] no caso comum, sem laço)."""
+        with self.lock:
+            mask = self.masks.get(unit, {}).get(point)
+            seg = mask[address:address + count] if mask is not None else None
+        if seg is None:
+            return list(range(address, address + count))
+        if len(seg) == count and 0 not in seg:
+            return []
+        missing = [address + i for i, m in enumerate(seg) if not m]
+        missing.extend(range(address + len(seg), address + count))
+        return missing
+
+    def read_registers(self, point: str, address: int, count: int, unit: int = 1) -> list[int]:
+        """FC3/FC4: slice da imagem; endereços fora da imagem (ou unit sem mapa) respondem 0."""
+        with self.lock:
+            img = self.images.get(unit)
+            regs = img[point][address:address + count].tolist() if img else []
+        if len(regs) < count:
+            regs.extend([0] * (count - len(regs)))
+        return regs
+
+    def read_bits(self, point: str, address: int, count: int, unit: int = 1) -> list[bool]:
+        """FC1/FC2: slice da imagem de bits; endereços fora da imagem respondem False."""
+        with self.lock:
+            img = self.images.get(unit)
+            seg = img[point][address:address + count] if img else b""
+        bits = [b != 0 for b in seg]
+        if len(bits) < count:
+            bits.extend([False] * (count - len(bits)))
+        return bits
 
 
 # ===========================
 # Blocos base reusáveis
 # ===========================
 
+def _validate(block, address: int, count: int) -> bool:
+    """
+    validate() dos blocos, respondido pela máscara do MappingService.
+    Endereços não mapeados são contados no diagnóstico; em modo estrito a requisição
+    é recusada (pymodbus responde Illegal Data Address), senão segue e lê zeros.
+    """
+    missing = block.mapping.unmapped(block.point_type, address, count, block.unit_id)
+    if not missing:
+        return True
+    block.mapping.diag.note(block.unit_id, block.point_type, UNMAPPED, missing)
+    return not block.strict
+
+
 class _BaseRegisterBlock(SequentialBlockBase):
     """
     Base para HR/IR (16 bits por word) usando MappingService.
-    Regras de leitura:
+    Leitura = slice da imagem de registradores:
       - INTEGER/UNSIGNED: 1 word
-      - FLOAT: 2 words (se remaining>=2) ou 1 word; suporta desalinhado com is_low_word.
+      - FLOAT: 2 words (hi em addr, lo em addr+1); leitura desalinhada devolve só a word pedida.
     """
-    def __init__(self, unit_id: int, mapping: MappingService, point_type: str, read_only: bool):
+    def __init__(self, unit_id: int, mapping: MappingService, point_type: str, read_only: bool,
+                 strict: bool = False):
         super().__init__(0, [0])
         self.unit_id = unit_id
         self.mapping = mapping
         self.point_type = point_type   # "hr" ou "ir"
         self.read_only = read_only
+        self.strict = strict           # True: não mapeado => exceção Illegal Data Address
 
     def validate(self, address, count=1):
-        return True  # responderemos zeros se não mapeado
+        return _validate(self, address, count)
 
-    def _lkp(self, addr: int) -> Optional[MappingEntry]:
-        return (self.mapping.lookup_hr(addr) if self.point_type == "hr"
-                else self.mapping.lookup_ir(addr))
+    def _note(self, kind: str, *addrs: int):
+        self.mapping.diag.note(self.unit_id, self.point_type, kind, addrs)
 
-    def _read_entry_words(self, entry: MappingEntry, remaining: int) -> tuple[list[int], int]:
-        """
-        Converte a entry em words Modbus e retorna (words, step_addr).
-        step_addr indica de quantos endereços avançar após responder.
-        """
-        dt = entry.dtype
-
-        if dt == "FLOAT":
-            val = float(try_get_value(entry.rv, 0.0))
-            words = read_float_words(val)  # [hi, lo] segundo config
-            if entry.is_low_word:
-                # Low-word isolada
-                return [words[1]], 1
-            # Base/high: pode responder 2 words se houver espaço
-            if remaining >= 2:
-                return words, 2
-            return [words[0]], 1
-
-        if dt == "INTEGER":
-            val = int(try_get_value(entry.rv, 0))
-            return [u16(val)], 1
-
-        if dt == "UNSIGNED":
-            val = int(try_get_value(entry.rv, 0))
-            return [u16(val)], 1
-
-        # Desconhecido -> 0
-        logger.warning(f"{self.point_type.upper()}: tipo desconhecido '{dt}'")
-        return [0], 1
+    def _lkp(self, addr: int) -> Optional[MappingEntry]:
+        return self.mapping.lookup(self.point_type, addr, self.unit_id)
 
     def getValues(self, address, count=1):
-        regs: list[int] = []
-        addr = address
-        end_addr = address + count
-
-        while addr < end_addr:
-            remaining = end_addr - addr
-            entry = self._lkp(addr)
-            if entry is None:
-                regs.append(0); addr += 1
-                continue
-
-            try:
-                words, step = self._read_entry_words(entry, remaining)
-                regs.extend(words)
-                addr += step
-            except Exception as e:
-                logger.error(f"Erro ao ler {self.point_type.upper()} {addr:02}: {e}")
-                regs.append(0); addr += 1
-
-        # Garante tamanho exato
-        if len(regs) != count:
-            regs = (regs + [0] * count)[:count]
-        return regs
+        return self.mapping.read_registers(self.point_type, address, count, self.unit_id)
 
     def setValues(self, address, values):
         if self.read_only:
-            logger.warning(f"Escrita ignorada em {self.point_type.upper()} (RO). Addr inicial: {address}")
+            self._note(WRITE_READ_ONLY, *range(address, address + len(values)))
             return
 
 
@@ -340,52 +548,40 @@ class _BaseBitBlock(SequentialBlockBase):
     """
     Base para CO/DI (bits), reusando MappingService.
     """
-    def __init__(self, unit_id: int, mapping: MappingService, point_type: str, read_only: bool):
+    def __init__(self, unit_id: int, mapping: MappingService, point_type: str, read_only: bool,
+                 strict: bool = False):
         super().__init__(0, [0])
         self.unit_id = unit_id
         self.mapping = mapping
         self.point_type = point_type   # "co" ou "di"
         self.read_only = read_only
+        self.strict = strict
 
     def validate(self, address, count=1):
-        return True
+        return _validate(self, address, count)
+
+    def _note(self, kind: str, *addrs: int):
+        self.mapping.diag.note(self.unit_id, self.point_type, kind, addrs)
 
     def _lkp(self, addr: int) -> Optional[MappingEntry]:
-        return (self.mapping.lookup_co(addr) if self.point_type == "co"
-                else self.mapping.lookup_di(addr))
+        return self.mapping.lookup(self.point_type, addr, self.unit_id)
 
     def getValues(self, address, count=1):
-        out = []
-        for i in range(count):
-            addr = address + i
-            entry = self._lkp(addr)
-            if entry is None:
-                logger.warning(f"Nenhuma {self.point_type.upper()} mapeada em {addr}")
-                out.append(False); continue
-            if entry.dtype != "BOOL":
-                logger.warning(f"{self.point_type.upper()} {addr} com tipo inválido: {entry.dtype}")
-                out.append(False); continue
-            try:
-                v = try_get_value(entry.rv, False)
-                out.append(coerce_to_bool(v))
-            except Exception as e:
-                logger.error(f"Erro ao ler {self.point_type.upper()} {addr}: {e}")
-                out.append(False)
-        return out
+        return self.mapping.read_bits(self.point_type, address, count, self.unit_id)
 
     def setValues(self, address, values):
         if self.read_only:
-            logger.warning(f"Escrita ignorada em {self.point_type.upper()} (RO). Addr inicial: {address}")
+            self._note(WRITE_READ_ONLY, *range(address, address + len(values)))
             return
 
-        for i, raw in enumerate(values):
-            addr = address + i
-            entry = self._lkp(addr)
+        # resolve os endereços sob o lock do mapeamento; as escritas nas ReactVar vêm depois
+        with self.mapping.lock:
+            entries = [(address + i, raw, self._lkp(address + i)) for i, raw in enumerate(values)]
+        for addr, raw, entry in entries:
             if entry is None:
-                logger.warning(f"Nenhuma {self.point_type.upper()} para escrita em {addr}")
-                continue
+                continue  # já contado em validate()
             if entry.dtype != "BOOL":
-                logger.warning(f"Escrita em {self.point_type.upper()} {addr} rejeitada: destino não-BOOL")
+                self._note(WRITE_NOT_BOOL, addr)
                 continue
             try:
                 desired = parse_coil_command(raw)
@@ -400,8 +596,8 @@ class _BaseBitBlock(SequentialBlockBase):
 # ===========================
 
 class HRDataBlock(_BaseRegisterBlock):
-    def __init__(self, unit_id: int, mapping: MappingService):
-        super().__init__(unit_id, mapping, point_type="hr", read_only=False)
+    def __init__(self, unit_id: int, mapping: MappingService, strict: bool = False):
+        super().__init__(unit_id, mapping, point_type="hr", read_only=False, strict=strict)
 
     def setValues(self, address, values):
         """
@@ -410,24 +606,32 @@ class HRDataBlock(_BaseRegisterBlock):
           - INTEGER/UNSIGNED: consome 1 word.
           - Endereço não mapeado: consome 1 word (skip).
         """
-        decoder = BinaryPayloadDecoder.fromRegisters(values, byteorder=BYTEORDER, wordorder=WORDORDER)
+        # decodifica sob o lock do mapeamento; as escritas nas ReactVar vêm depois
+        with self.mapping.lock:
+            writes = self._decode(address, values)
+        for addr, rv, value in writes:
+            try:
+                rv.setValue(value)
+            except Exception as e:
+                logger.error(f"Escrita HR falhou em {addr}: {e}")
+
+    def _decode(self, address, values) -> list:
+        """[(addr, ReactVar, valor)] das words recebidas, segundo o mapeamento atual."""
+        writes = []
         addr = address
         remaining = len(values)
 
         while remaining > 0:
-            entry = self.mapping.lookup_hr(addr)
+            entry = self._lkp(addr)
 
             # Low-word de FLOAT (escrita desalinhada) é ignorada por desenho:
             if entry and entry.dtype == "FLOAT" and entry.is_low_word:
-                logger.warning(f"Escrita na low-word de FLOAT em HR {addr} ignorada (use endereço base).")
-                decode_skip_word(decoder)
+                self._note(WRITE_LOW_WORD, addr)
                 addr += 1
                 remaining -= 1
                 continue
 
-            if entry is None:
-                logger.warning(f"HR {addr} não mapeado; ignorando 1 word.")
-                decode_skip_word(decoder)
+            if entry is None:  # já contado em validate()
                 addr += 1
                 remaining -= 1
                 continue
@@ -435,54 +639,53 @@ class HRDataBlock(_BaseRegisterBlock):
             try:
                 if entry.dtype == "FLOAT":
                     if remaining < 2:
-                        logger.warning(f"Escrita FLOAT em HR {addr} requer 2 words (restam {remaining}). Abortando.")
-                        return
-                    value = decoder.decode_32bit_float()
+                        self._note(WRITE_TRUNCATED, addr)
+                        return writes
+                    value = CODEC.decode_float32(values[addr - address], values[addr - address + 1])
                     if value == value and value not in (float("inf"), float("-inf")):
-                        entry.rv.setValue(float(value))
+                        writes.append((addr, entry.rv, float(value)))
                     else:
-                        logger.warning(f"Valor FLOAT inválido (NaN/Inf) em HR {addr}; ignorado.")
+                        self._note(WRITE_INVALID, addr)
                     addr += 2
                     remaining -= 2
 
                 elif entry.dtype == "INTEGER":
-                    value = decoder.decode_16bit_int()
-                    entry.rv.setValue(int(value))
+                    value = CODEC.decode_int16(values[addr - address])
+                    writes.append((addr, entry.rv, int(value)))
                     addr += 1
                     remaining -= 1
 
                 elif entry.dtype == "UNSIGNED":
-                    value = decoder.decode_16bit_uint()
-                    entry.rv.setValue(int(value))
+                    value = CODEC.decode_uint16(values[addr - address])
+                    writes.append((addr, entry.rv, int(value)))
                     addr += 1
                     remaining -= 1
 
                 else:
                     logger.warning(f"Tipo inválido em HR {addr}: {entry.dtype}. Consumindo 1 word.")
-                    decode_skip_word(decoder)
                     addr += 1
                     remaining -= 1
 
             except Exception as e:
                 logger.error(f"Escrita HR falhou em {addr}: {e}")
-                decode_skip_word(decoder)
                 addr += 1
                 remaining -= 1
+        return writes
 
 
 class IRDataBlock(_BaseRegisterBlock):
-    def __init__(self, unit_id: int, mapping: MappingService):
-        super().__init__(unit_id, mapping, point_type="ir", read_only=True)
+    def __init__(self, unit_id: int, mapping: MappingService, strict: bool = False):
+        super().__init__(unit_id, mapping, point_type="ir", read_only=True, strict=strict)
 
 
 class CoilDataBlock(_BaseBitBlock):
-    def __init__(self, unit_id: int, mapping: MappingService):
-        super().__init__(unit_id, mapping, point_type="co", read_only=False)
+    def __init__(self, unit_id: int, mapping: MappingService, strict: bool = False):
+        super().__init__(unit_id, mapping, point_type="co", read_only=False, strict=strict)
 
 
 class DiscreteInputDataBlock(_BaseBitBlock):
-    def __init__(self, unit_id: int, mapping: MappingService):
-        super().__init__(unit_id, mapping, point_type="di", read_only=True)
+    def __init__(self, unit_id: int, mapping: MappingService, strict: bool = False):
+        super().__init__(unit_id, mapping, point_type="di", read_only=True, strict=strict)
 
 
 # ===========================
@@ -499,16 +702,26 @@ class IdentityInfo:
 class ModbusServer:
     """
     Servidor Modbus TCP em thread separada com shutdown limpo via stop_condition.
+    strict=True responde Illegal Data Address (exceção 02) a acessos com endereço
+    não mapeado; por padrão eles leem zeros e só entram no diagnóstico (self.diag).
     """
-    def __init__(self, react_factory: ReactFactory, identity: IdentityInfo | None = None):
+    def __init__(self, react_factory: ReactFactory, identity: IdentityInfo | None = None,
+                 strict: bool = False):
         self.rf = react_factory
         self.mapping = MappingService(react_factory)
         self.identity = identity or IdentityInfo()
+        self.strict = strict
 
         self._thread: Optional[threading.Thread] = None
         self._stop_evt = threading.Event()
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._port: Optional[int] = None
+        self.context: Optional[ModbusServerContext] = None  # contexto servido (após start)
+
+    @property
+    def diag(self) -> BlockDiagnostics:
+        """Contadores por endereço das ocorrências dos blocos (consultáveis com o servidor rodando)."""
+        return self.mapping.diag
 
     # -------- ciclo de vida --------
     def start(self, port: int = 502):
@@ -527,6 +740,8 @@ class ModbusServer:
 
     def stop(self):
         """Solicita parada e aguarda a thread terminar (shutdown limpo)."""
+        self.mapping.detach()
+        self.mapping.diag.flush()
         if self._thread and self._thread.is_alive():
             logger.info("Sinalizando parada do Modbus...")
             self._stop_evt.set()
@@ -571,14 +786,14 @@ class ModbusServer:
         # Cria data blocks com o serviço de mapeamento
         slaves = {
             sid: ModbusSlaveContext(
-                di=DiscreteInputDataBlock(sid, self.mapping),
-                co=CoilDataBlock(sid, self.mapping),
-                hr=HRDataBlock(sid, self.mapping),
-                ir=IRDataBlock(sid, self.mapping),
+                di=DiscreteInputDataBlock(sid, self.mapping, self.strict),
+                co=CoilDataBlock(sid, self.mapping, self.strict),
+                hr=HRDataBlock(sid, self.mapping, self.strict),
+                ir=IRDataBlock(sid, self.mapping, self.strict),
             )
-            for sid in range(1, 2)  # ajuste se for usar múltiplos unit IDs
+            for sid in (self.mapping.units or {1: None})  # um unit ID por coluna de CLP
         }
-        context = ModbusServerContext(slaves=slaves, single=False)
+        context = self.context = ModbusServerContext(slaves=slaves, single=False)
 
         ident = ModbusDeviceIdentification()
         ident.VendorName = self.identity.vendor
@@ -1,6 +1,7 @@
 # qt_compat.py — Minimal compatibility layer replacing small parts of PySide6.QtCore
 # Provides: QObject, Signal, Slot
 # - Signal has an anti-reentrancy guard to avoid recursive emits (common pitfall when porting from Qt).
+# - Like Qt, a Signal declared on a class is bound per instance: each object gets its own subscribers.
 
 from typing import Callable, List, Any
 import threading
@@ -13,10 +14,23 @@ class QObject:
 
 class Signal:
     def __init__(self, *types):
+        self._types = types
+        self._name = None
         self._subs: List[Callable[..., Any]] = []
         self._lock = threading.RLock()
         self._emitting_local = threading.local()  # per-thread reentrancy flag
 
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    def __get__(self, obj, objtype=None):
+        # class access (or a Signal created outside a class body) -> the signal itself
+        if obj is None or self._name is None:
+            return self
+        # first instance access: create the bound signal and cache it in the instance dict,
+        # which shadows this (non-data) descriptor from then on
+        return obj.__dict__.setdefault(self._name, Signal(*self._types))
+
     def connect(self, func: Callable[..., Any]):
         with self._lock:
             if func not in self._subs:
@@ -0,0 +1,124 @@
+import ast
+import math
+import random
+import re
+from functools import lru_cache
+from types import SimpleNamespace
+import numpy as np
+from numpy import exp, log
+
+# TABELA.COLUNA.LINHA (mesmo padrão usado pelo ReactVar)
+TOKEN_RE = re.compile(r'[A-Z]\w+\.[A-Z0-9]\w+\.[A-Za-z_0-9]\w+')
+
+# Nomes visíveis nas expressões (equivalente ao symtable usado com asteval)
+EXPR_ENV = {
+    'math':   math,
+    'exp':    exp,
+    'random': random,
+    'log':    log,
+    'abs':    abs,
+    'int':    int,
+}
+_MODULES = ('math', 'random')
+
+# Ambiente da avaliação vetorizada: mesmos nomes, versões NumPy elemento a elemento
+_VECTOR_MATH = SimpleNamespace(
+    **{name: getattr(np, name) for name in (
+        'sqrt', 'exp', 'log', 'log10', 'log2', 'sin', 'cos', 'tan',
+        'sinh', 'cosh', 'tanh', 'floor', 'ceil', 'trunc', 'fabs')},
+    asin=np.arcsin, acos=np.arccos, atan=np.arctan,
+    pi=math.pi, e=math.e,
+)
+VECTOR_ENV = {
+    'math': _VECTOR_MATH,
+    'exp':  np.exp,
+    'log':  np.log,
+    'abs':  np.abs,
+    'int':  np.trunc,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Attribute, ast.Constant, ast.keyword,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+def _slot(i: int) -> str:
+    return f'_v{i}'
+
+def tokens(text: str) -> list[str]:
+    """Tokens TABELA.COLUNA.LINHA distintos, na ordem em que aparecem."""
+    return list(dict.fromkeys(TOKEN_RE.findall(text or '')))
+
+def _validate(tree: ast.AST, nSlots: int):
+    slots = {_slot(i) for i in range(nSlots)}
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"construção não permitida: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in EXPR_ENV and node.id not in slots:
+            raise ValueError(f"nome desconhecido: {node.id}")
+        if isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id in _MODULES) \
+               or node.attr.startswith('_'):
+                raise ValueError(f"atributo não permitido: {ast.unparse(node)}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+            raise ValueError(f"constante não permitida: {node.value!r}")
+
+class CompiledExpr:
+    """
+    Expressão Func já validada e compilada.
+    Os tokens são trocados por parâmetros posicionais (_v0, _v1, ...): avaliar
+    é só chamar a função com os valores atuais, na ordem de `tokens`.
+    """
+    __slots__ = ('text', 'tokens', 'template', '_fn')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tuple(tokens(text))
+        index = {tok: i for i, tok in enumerate(self.tokens)}
+        source = TOKEN_RE.sub(lambda m: _slot(index[m.group(0)]), text).strip()
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"sintaxe inválida: {e.msg}") from None
+        _validate(tree, len(self.tokens))
+        self.template = source  # igual para fórmulas estruturalmente idênticas
+        params = ', '.join(_slot(i) for i in range(len(self.tokens)))
+        code = compile(f"lambda {params}: ({source})", f"<Func {text}>", 'eval')
+        self._fn = eval(code, {'__builtins__': {}, **EXPR_ENV})
+
+    def __call__(self, values) -> float:
+        """Avalia com os valores das entradas; erro de execução resulta em 0.0 (como no asteval)."""
+        try:
+            result = self._fn(*values)
+            return float(result) if result is not None else 0.0
+        except Exception:
+            return 0.0
+
+@lru_cache(maxsize=1024)
+def compile_expr(text: str) -> CompiledExpr:
+    """Compila (uma vez por texto) uma expressão Func. Levanta ValueError se inválida."""
+    return CompiledExpr(text)
+
+@lru_cache(maxsize=1024)
+def compile_vector(template: str, nSlots: int):
+    """
+    Versão NumPy de um template já validado (ver CompiledExpr.template): recebe um
+    vetor por slot e devolve o vetor de resultados. None se o template não for
+    vetorizável (random, comparações/condicionais, chamadas com mais de um argumento).
+    """
+    tree = ast.parse(template, mode='eval')
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Compare, ast.BoolOp, ast.IfExp, ast.Not)):
+            return None
+        if isinstance(node, ast.Name) and node.id not in VECTOR_ENV and not node.id.startswith('_v'):
+            return None
+        if isinstance(node, ast.Attribute) and not hasattr(_VECTOR_MATH, node.attr):
+            return None
+        if isinstance(node, ast.Call) and (len(node.args) != 1 or node.keywords):
+            return None
+    params = ', '.join(_slot(i) for i in range(nSlots))
+    code = compile(f"lambda {params}: ({template})", f"<vector {template}>", 'eval')
+    return eval(code, {'__builtins__': {}, **VECTOR_ENV})
@@ -2,12 +2,15 @@ import asyncio
 from .qt_compat import QObject, Signal, Slot
 import pandas as pd
 from db_files.db_storage import DBStorage
+from db_files.db_types import DBModel
 from react.react_var import ReactVar  # ajuste conforme seu pacote
+from react.react_graph import ReactGraph
 
 class ReactFactory(QObject):
     """
     Fábrica assíncrona para ReactVar.
-    Cria dataframes vazios, instancia todos os ReactVar e então carrega seus dados.
+    Lê cada tabela de uma vez (um SELECT por tabela), instancia todos os ReactVar
+    e carrega seus dados a partir desse snapshot em memória.
     """
     df: dict
     autoCompleteList: dict
@@ -17,38 +20,55 @@ class ReactFactory(QObject):
         super().__init__()
 
     @classmethod
-    async def create(cls, tableNames: list[str]) -> "ReactFactory":
+    async def create(cls, tableNames: list[str], storage: DBStorage | None = None) -> "ReactFactory":
         """
         Cria ReactFactory e inicializa todos os ReactVar para as tabelas listadas.
         Exemplo:
             react_factory = await ReactFactory.create(['HART', 'MODBUS'])
+        `storage` substitui o banco persistente padrão (p.ex. uma cópia temporária).
         """
         self = cls.__new__(cls)
         QObject.__init__(self)
         self.tableNames = tableNames
-        self.storage = DBStorage('db/banco.db')
+        self.storage = storage or DBStorage('db/banco.db')
         self.df = {}
         self.autoCompleteList = {}
+        self.graph = ReactGraph()  # dependências entre Func/tFunc
 
-        # 1) Cria DataFrames e instancia ReactVar (sem carregar DB)
+        # 1) Lê cada tabela com um único SELECT * e instancia os ReactVar
+        loop = asyncio.get_event_loop()
+        snapshots = {}
         for table in tableNames:
-            rows = self.storage.rowKeys(table)
-            cols = self.storage.colKeys(table)
-            self.df[table] = pd.DataFrame(index=rows, columns=cols, dtype=object)
+            cols, rows = await loop.run_in_executor(None, self.storage.tableSnapshot, table)
+            snapshots[table] = rows
+            self.storage.primeMeta(table, rows)
+            self.df[table] = pd.DataFrame(index=list(rows), columns=cols, dtype=object)
             for row in rows:
                 for col in cols:
                     var = ReactVar(table, row, col, self)
                     self.df[table].at[row, col] = var
                     var.isTFuncSignal.connect(self._tFDataSlot)
 
-        # 2) Carrega dados de todas as variáveis em paralelo
-        tasks = []
+        # 2) Carrega os dados a partir do snapshot em memória:
+        #    primeiro os valores, depois Func/tFunc (que leem os valores já carregados)
+        deferred = []
         for table in tableNames:
+            rows = snapshots[table]
             for row in self.df[table].index:
+                typeName, byteSize = self._rowMeta(table, row)
                 for col in self.df[table].columns:
                     var: ReactVar = self.df[table].at[row, col]
-                    tasks.append(asyncio.create_task(var._startDatabase()))
-        await asyncio.gather(*tasks)
+                    data = DBStorage.snapshotData(rows, row, col)
+                    if var.getModel(data) == DBModel.Value:
+                        var._loadData(data, typeName, byteSize)
+                    else:
+                        deferred.append((var, data))
+        for var, data in deferred:
+            var._loadData(data)
+        for table in tableNames:
+            for row in self.df[table].index:
+                for col in self.df[table].columns:
+                    self.df[table].at[row, col]._markInitialized()
 
         # 3) Inicializa listas de autocomplete
         for table in tableNames:
@@ -59,6 +79,14 @@ class ReactFactory(QObject):
 
         return self
 
+    def _rowMeta(self, table: str, row: str) -> tuple:
+        """(TYPE, BYTE_SIZE) da linha pelo índice de metadados; (None, None) se não resolvível."""
+        try:
+            meta = self.storage.rowMeta(table, row)
+            return meta.typeName, int(meta.byteSize)
+        except Exception:
+            return None, None
+
     @Slot(object, bool)
     def _tFDataSlot(self, data: ReactVar, isConnect: bool):
         """Repropaga sinal de tFunc"""
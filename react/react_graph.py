@@ -0,0 +1,250 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from db_files.db_types import DBModel
+from .react_expr import compile_vector
+
+class ReactGraph:
+    """
+    Grafo de dependências (DAG) entre ReactVar com expressões Func/tFunc.
+
+    - link(var, entradas): registra as arestas entrada -> var, rejeitando ciclos.
+      Um ciclo só é aceito se passar por um tFunc: a saída do tFunc não depende
+      instantaneamente da sua entrada (o sistema dinâmico quebra o laço).
+    - propagate(*fontes): marca como sujos os nós a jusante das fontes e
+      reavalia cada um uma única vez, em ordem topológica. Os sinais
+      valueChangedSignal só são emitidos ao final, com o estado já consistente
+      (sem "glitches" em dependências em diamante).
+    - Modo vetorizado (vectorize=True ou REACT_VECTORIZE=1): em cada nível
+      topológico, expressões estruturalmente idênticas (mesmo template, p.ex.
+      a mesma fórmula em todas as colunas de transmissores) são avaliadas numa
+      única operação NumPy e os resultados devolvidos a cada ReactVar.
+    - deferEmit(): dentro do bloco, na thread que o abriu, os sinais não são
+      emitidos e sim acumulados na lista devolvida, para emitAll() posterior
+      (p.ex. a thread HART responde ao mestre antes de atualizar a UI).
+    - lock: trava (reentrante) das escritas. Quem altera valores de ReactVar fora da
+      thread da UI grava e propaga com ela adquirida e emite depois de soltá-la
+      (propagate(..., emit=False) + emit()), para os handlers dos sinais nunca
+      rodarem com a trava do grafo.
+    """
+
+    def __init__(self, vectorize: bool | None = None, minGroup: int = 4):
+        self._inputs: dict = {}       # {var: tuple(entradas)}
+        self._dependents: dict = {}   # {var: {dependente: None}} (conjunto ordenado)
+        self._orderCache: dict = {}   # {frozenset(fontes): [níveis topológicos]}
+        self._lock = threading.RLock()   # estrutura, ordem e escritas de valores (ver `lock`)
+        self._local = threading.local()  # .sink: lista de nós com emissão adiada (deferEmit)
+        if vectorize is None:
+            vectorize = os.environ.get("REACT_VECTORIZE", "0") == "1"
+        self.vectorize = bool(vectorize)
+        self.minGroup = max(2, int(minGroup))  # grupos menores são avaliados escalarmente
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Trava compartilhada pelas escritas de valores e pela propagação."""
+        return self._lock
+
+    # ------------------------- estrutura -------------------------
+
+    @staticmethod
+    def _isTFunc(var) -> bool:
+        return var.model == DBModel.tFunc
+
+    def inputs(self, var) -> tuple:
+        return self._inputs.get(var, ())
+
+    def dependents(self, var) -> tuple:
+        return tuple(self._dependents.get(var, ()))
+
+    def link(self, var, inputs):
+        """Substitui as entradas de `var`. Levanta ValueError se criar um ciclo instantâneo."""
+        inputs = tuple(dict.fromkeys(inputs))
+        with self._lock:
+            if not self._isTFunc(var):
+                for inp in inputs:
+                    if inp is var or self._reaches(var, inp):
+                        raise ValueError(
+                            f"Ciclo de dependência: {inp.tableName}.{inp.colName}.{inp.rowName} "
+                            f"depende de {var.tableName}.{var.colName}.{var.rowName}")
+            self._unlink(var)
+            self._inputs[var] = inputs
+            for inp in inputs:
+                self._dependents.setdefault(inp, {})[var] = None
+            self._orderCache.clear()
+
+    def unlink(self, var):
+        with self._lock:
+            self._unlink(var)
+            self._orderCache.clear()
+
+    def _unlink(self, var):
+        for inp in self._inputs.pop(var, ()):
+            deps = self._dependents.get(inp)
+            if deps is not None:
+                deps.pop(var, None)
+                if not deps:
+                    del self._dependents[inp]
+
+    def levels(self, sources) -> list:
+        """Níveis topológicos dos nós afetados pelas fontes (para avaliações fora do grafo vivo)."""
+        with self._lock:
+            return self._order(frozenset(sources))
+
+    def _reaches(self, start, target) -> bool:
+        """Existe caminho instantâneo start -> ... -> target? (não atravessa tFunc)"""
+        stack = [start]
+        seen = {start}
+        while stack:
+            node = stack.pop()
+            for dep in self._dependents.get(node, ()):
+                if dep is target:
+                    return True
+                if dep in seen or self._isTFunc(dep):
+                    continue
+                seen.add(dep)
+                stack.append(dep)
+        return False
+
+    def _order(self, sources: frozenset) -> list:
+        """
+        Nós afetados pelas fontes em níveis topológicos (memorizado por conjunto de fontes):
+        os nós de um nível só dependem de níveis anteriores.
+        """
+        levels = self._orderCache.get(sources)
+        if levels is not None:
+            return levels
+
+        # 1) conjunto sujo: tudo a jusante; tFunc que não é fonte não propaga
+        #    (a avaliação só atualiza sua entrada, não sua saída)
+        affected = dict.fromkeys(sources)
+        stack = list(sources)
+        while stack:
+            node = stack.pop()
+            if node not in sources and self._isTFunc(node):
+                continue
+            for dep in self._dependents.get(node, ()):
+                if dep not in affected:
+                    affected[dep] = None
+                    stack.append(dep)
+
+        # 2) Kahn em ondas, restrito aos afetados; arestas saindo de tFunc não restringem
+        #    a ordem (sua saída já está definida no início da passada): o grafo fica acíclico
+        indegree = dict.fromkeys(affected, 0)
+        for node in affected:
+            if self._isTFunc(node):
+                continue
+            for dep in self._dependents.get(node, ()):
+                if dep in indegree:
+                    indegree[dep] += 1
+        levels = []
+        level = [n for n, d in indegree.items() if d == 0]
+        while level:
+            levels.append(level)
+            following = []
+            for node in level:
+                if self._isTFunc(node):
+                    continue
+                for dep in self._dependents.get(node, ()):
+                    if dep in indegree:
+                        indegree[dep] -= 1
+                        if indegree[dep] == 0:
+                            following.append(dep)
+            level = following
+
+        self._orderCache[sources] = levels
+        return levels
+
+    # ------------------------- propagação -------------------------
+
+    def propagate(self, *sources, emit: bool = True) -> list:
+        """
+        Reavalia, uma vez cada, os nós a jusante das fontes (cujos valores já mudaram).
+        Retorna os nós cujo valor mudou; se emit=True, emite o sinal das fontes e deles.
+        """
+        if not sources:
+            return []
+        isWidget = any(getattr(s, "isWidgetValueChanged", False) for s in sources)
+        with self._lock:
+            changed = set(sources)
+            updated = []
+            for level in self._order(frozenset(sources)):
+                dirty = [node for node in level
+                         if any(i in changed for i in self._inputs.get(node, ()))]
+                if not dirty:
+                    continue
+                results = self._evaluateVector(dirty) if self.vectorize and len(dirty) >= self.minGroup else {}
+                for node in dirty:
+                    if node in results:
+                        isChanged = node._applyResult(results[node], isWidget)
+                    else:
+                        isChanged = node._recompute(isWidget)
+                    if isChanged:
+                        changed.add(node)
+                        updated.append(node)
+        if emit:
+            self.emit(*sources, *updated)
+        return updated
+
+    def emit(self, *nodes) -> None:
+        """Emite valueChangedSignal dos nós, ou os acumula se a thread estiver num deferEmit()."""
+        sink = getattr(self._local, "sink", None)
+        if sink is not None:
+            sink.extend(nodes)
+        else:
+            for node in nodes:
+                node.valueChangedSignal.emit(node)
+
+    @contextmanager
+    def deferEmit(self):
+        """Acumula (em vez de emitir) os sinais das propagações feitas nesta thread dentro do bloco."""
+        previous = getattr(self._local, "sink", None)
+        sink = []
+        self._local.sink = sink
+        try:
+            yield sink
+        finally:
+            self._local.sink = previous
+
+    @staticmethod
+    def emitAll(nodes) -> None:
+        """Emite valueChangedSignal uma vez por nó (na ordem da primeira ocorrência)."""
+        for node in dict.fromkeys(nodes):
+            node.valueChangedSignal.emit(node)
+
+    def _evaluateVector(self, nodes: list) -> dict:
+        """
+        Avalia em lote os nós de um mesmo nível agrupados por template.
+        Retorna {nó: resultado} só para os membros resolvidos vetorialmente; os demais
+        (entradas None/não numéricas/não finitas, resultado não finito, grupos pequenos
+        ou templates não vetorizáveis) ficam para a avaliação escalar.
+        """
+        groups: dict = {}
+        for node in nodes:
+            expr = node._expr
+            if expr is None or None in node._inputVars:
+                continue
+            values = [v._value for v in node._inputVars]
+            if all(isinstance(x, (int, float)) for x in values):
+                groups.setdefault(expr.template, []).append((node, values))
+
+        results = {}
+        for template, members in groups.items():
+            if len(members) < self.minGroup:
+                continue
+            fn = compile_vector(template, len(members[0][1]))
+            if fn is None:
+                continue
+            matrix = np.array([values for _, values in members], dtype=float)
+            if matrix.ndim != 2:
+                continue
+            try:
+                with np.errstate(all='ignore'):
+                    out = np.broadcast_to(np.asarray(fn(*matrix.T), dtype=float), (len(members),))
+            except Exception:
+                continue
+            ok = np.isfinite(out) & np.isfinite(matrix).all(axis=1)
+            for (node, _), good, value in zip(members, ok.tolist(), out.tolist()):
+                if good:
+                    results[node] = value
+        return results
@@ -2,11 +2,10 @@ import asyncio
 from .qt_compat import QObject, Signal, Slot
 from hrt.hrt_type import hrt_type_hex_to, hrt_type_hex_from
 from db_files.db_types import DBState, DBModel
-from asteval import Interpreter
-from numpy import exp, log
-import random
-import math
-import re
+from .react_expr import compile_expr, tokens as exprTokens
+
+# Colunas de metadados: gravadas/lidas como texto puro, sem translate
+META_COLS = ('NAME', 'TYPE', 'BYTE_SIZE', 'MB_POINT', 'ADDRESS')
 
 class ReactVar(QObject):
     valueChangedSignal = Signal(object)
@@ -19,7 +18,6 @@ class ReactVar(QObject):
         self.colName = colName
         self.reactFactory = reactFactory
         self.isWidgetValueChanged = False
-        self._evaluator = Interpreter()
 
         # Async init tracking
         self._initialized = False
@@ -32,6 +30,8 @@ class ReactVar(QObject):
         self._func = None
         self._tFunc = None
         self._tokens: list[str] = []
+        self._expr = None           # CompiledExpr da função atual
+        self._inputVars: list = []  # ReactVar de cada token, na ordem dos slots da expressão
 
     async def _startDatabase(self):
         loop = asyncio.get_event_loop()
@@ -42,15 +42,28 @@ class ReactVar(QObject):
             self.rowName,
             self.colName
         )
-
+        self._loadData(data)
+        self._markInitialized()
+
+    def _loadData(self, data, typeName: str | None = None, byteSize: int | None = None):
+        """
+        Aplica o dado bruto lido do banco (sem regravá-lo).
+        typeName/byteSize podem vir do snapshot da tabela para evitar novas consultas.
+        """
         newModel = self.getModel(data)
         if newModel == DBModel.Value:
-            self.setValue(data, stateAtual=DBState.machineValue)
+            if typeName is None or byteSize is None or self.colName in META_COLS:
+                self.setValue(data, stateAtual=DBState.machineValue)
+            else:
+                self._value = self.translate(data, typeName, byteSize,
+                                             DBState.humanValue, DBState.machineValue)
+                self.model = DBModel.Value
         elif newModel == DBModel.Func:
             self.setFunc(data[1:])
         elif newModel == DBModel.tFunc:
             self.setTFunc(data[1:])
 
+    def _markInitialized(self):
         self._initialized = True
         self._init_event.set()
 
@@ -58,7 +71,7 @@ class ReactVar(QObject):
         if not self._initialized:
             await self._init_event.wait()
 
-        if self.colName in ['NAME', 'TYPE', 'BYTE_SIZE', 'MB_POINT', 'ADDRESS']:
+        if self.colName in META_COLS:
             return self._value
 
         return self.translate(
@@ -92,13 +105,17 @@ class ReactVar(QObject):
         if tableName is None or rowName is None:
             tableName = self.tableName
             rowName = self.rowName
-        return self.reactFactory.storage.getData(tableName, rowName, 'TYPE')
+        return self.reactFactory.storage.rowMeta(tableName, rowName).typeName
 
     def byteSize(self, tableName=None, rowName=None):
         if tableName is None or rowName is None:
             tableName = self.tableName
             rowName = self.rowName
-        return int(self.reactFactory.storage.getData(tableName, rowName, 'BYTE_SIZE'))
+        return int(self.reactFactory.storage.rowMeta(tableName, rowName).byteSize)
+
+    def typeFamily(self) -> str:
+        """Família do tipo já interpretada ('FLOAT', 'ENUM', 'BIT_ENUM', ...)."""
+        return self.reactFactory.storage.rowMeta(self.tableName, self.rowName).family
 
     def getModel(self, value=None) -> DBModel:
         if value is None:
@@ -111,124 +128,144 @@ class ReactVar(QObject):
         return DBModel.Value
 
     def setValue(self, value, stateAtual: DBState = DBState.humanValue, isWidgetValueChanged: bool = False):
-        self.isWidgetValueChanged = isWidgetValueChanged
-
-        # 1) Valor "humano" para a UI (_value)
-        if self.colName in ['NAME', 'TYPE', 'BYTE_SIZE', 'MB_POINT', 'ADDRESS']:
-            valueAux = value
-            storage_value = value  # meta-campos gravam como texto puro
-        else:
-            self._checkModel(DBModel.Value)
-            valueAux = self.translate(value, self.type(), self.byteSize(),
-                                    DBState.humanValue, stateAtual)
-            # 2) Valor "machine" para o banco
-            storage_value = self.translate(value, self.type(), self.byteSize(),
-                                        DBState.machineValue, stateAtual)
-
-        self._func = None
-        self._tFunc = None
-        isChanged = (self._value != valueAux)
-        self._value = valueAux
-        self.model = DBModel.Value
+        graph = self.reactFactory.graph
+        # Escrita e reavaliação sob graph.lock (a thread HART e a UI escrevem nas mesmas
+        # variáveis); os sinais só são emitidos depois de soltá-la
+        with graph.lock:
+            self.isWidgetValueChanged = isWidgetValueChanged
+
+            # 1) Valor "humano" para a UI (_value)
+            if self.colName in META_COLS:
+                valueAux = value
+                storage_value = value  # meta-campos gravam como texto puro
+            else:
+                self._checkModel(DBModel.Value)
+                valueAux = self.translate(value, self.type(), self.byteSize(),
+                                        DBState.humanValue, stateAtual)
+                # 2) Valor "machine" para o banco
+                storage_value = self.translate(value, self.type(), self.byteSize(),
+                                            DBState.machineValue, stateAtual)
+
+            self._func = None
+            self._tFunc = None
+            isChanged = (self._value != valueAux)
+            self._value = valueAux
+            self.model = DBModel.Value
 
-        # 3) PERSISTE no SQLite
-        try:
-            self.reactFactory.storage.setRawData(self.tableName, self.rowName, self.colName, storage_value)
-        except Exception as e:
-            print(f"[WARN] Persistência Value falhou em {self.tableName}.{self.colName}.{self.rowName}: {e}")
+            # 3) PERSISTE no SQLite
+            self._persist(storage_value, "Value")
 
-        if isChanged:
-            self.valueChangedSignal.emit(self)
+            # 4) Reavalia as funções dependentes (uma vez cada, em ordem topológica)
+            updated = graph.propagate(self, emit=False) if isChanged else None
+        if updated is not None:
+            graph.emit(self, *updated)
 
 
     def setFunc(self, func: str):
         if self._func != func:
-            self._checkModel(DBModel.Func)
-            self._tFunc = None
-            self.model = DBModel.Func
+            graph = self.reactFactory.graph
+            with graph.lock:
+                self._checkModel(DBModel.Func)
+                self._tFunc = None
+                self.model = DBModel.Func
 
-            # PERSISTE com prefixo '@'
-            try:
-                self.reactFactory.storage.setRawData(self.tableName, self.rowName, self.colName, '@' + (func or ''))
-            except Exception as e:
-                print(f"[WARN] Persistência Func falhou em {self.tableName}.{self.colName}.{self.rowName}: {e}")
+                # PERSISTE com prefixo '@'
+                self._persist('@' + (func or ''), "Func")
 
-            self._startFunc(func)
+                changed = self._startFunc(func)
+            graph.emit(*changed)
 
 
     def setTFunc(self, tFunc: str):
         if self._tFunc != tFunc:
-            self._checkModel(DBModel.tFunc)
-            self.model = DBModel.tFunc
-            self._value = 0
-            self._tFunc = tFunc
-
-            # PERSISTE com prefixo '$'
-            try:
-                self.reactFactory.storage.setRawData(self.tableName, self.rowName, self.colName, '$' + (tFunc or ''))
-            except Exception as e:
-                print(f"[WARN] Persistência TFunc falhou em {self.tableName}.{self.colName}.{self.rowName}: {e}")
-
-            # Mantém a lógica original
-            _, __, ___, inp = tFunc.split(',')
-            self._startFunc(inp[1:])
+            graph = self.reactFactory.graph
+            with graph.lock:
+                self._checkModel(DBModel.tFunc)
+                self.model = DBModel.tFunc
+                self._value = 0
+                self._tFunc = tFunc
+
+                # PERSISTE com prefixo '$'
+                self._persist('$' + (tFunc or ''), "TFunc")
+
+                # Mantém a lógica original
+                _, __, ___, inp = tFunc.split(',')
+                changed = self._startFunc(inp[1:])
+            graph.emit(*changed)
             self.isTFuncSignal.emit(self, True)
 
 
+    def _persist(self, storage_value, label: str):
+        # Durante a carga inicial o valor acabou de vir do banco: não regrava
+        if not self._initialized:
+            return
+        try:
+            self.reactFactory.storage.queueRawData(self.tableName, self.rowName, self.colName, storage_value)
+        except Exception as e:
+            print(f"[WARN] Persistência {label} falhou em {self.tableName}.{self.colName}.{self.rowName}: {e}")
+
     def _checkModel(self, newModel: DBModel):
         oldModel = self.model
         if oldModel is not None and oldModel != newModel:
-            self._connectTokens(self._tokens, False)
+            self.reactFactory.graph.unlink(self)
+            self._tokens = []
+            self._inputVars = []
+            self._expr = None
             if oldModel == DBModel.tFunc:
                 self.isTFuncSignal.emit(self, False)
 
-    def _startFunc(self, func: str):
+    def _startFunc(self, func: str) -> list:
+        """Compila e liga a função; retorna os nós cujo sinal o chamador emite (fora de graph.lock)."""
         self._func = func
-        tokens = re.findall(r'[A-Z]\w+\.[A-Z0-9]\w+\.[A-Za-z_0-9]\w+', func)
+        try:
+            self._expr = compile_expr(func)
+        except ValueError as e:
+            print(f"[WARN] Expressão inválida em {self.tableName}.{self.colName}.{self.rowName}: {func!r} ({e})")
+            self._expr = None
+        tokens = exprTokens(func)
         if self._tokens != tokens:
-            self._evaluator.symtable.clear()
-            self._evaluator.symtable.update({
-                'math':   math,
-                'exp':    exp,
-                'random': random,
-                'log':    log,
-                'abs':    abs,
-                'int':    int                
-            })
-            self._connectTokens(tokens, True)
+            self._linkTokens(tokens)
             self._tokens = tokens
-
-    def _evaluate_expression(self, expr: str) -> float:
-        sanitized = re.sub(r'([A-Z]\w+)\.([A-Z0-9]\w+)\.([A-Za-z_0-9]\w+)', r"\1_\2_\3", expr)
-        result = self._evaluator(sanitized)
-        return float(result) if result is not None else 0.0
-
-    def _connectTokens(self, tokens: list[str], isconnect: bool = True):
+        if self._func:
+            # Avalia com os valores atuais e repropaga para quem depende desta variável
+            if self._recompute(self.isWidgetValueChanged):
+                return [self, *self.reactFactory.graph.propagate(self, emit=False)]
+        return []
+
+    def _linkTokens(self, tokens: list[str]):
+        """Registra as entradas desta função no grafo de dependências."""
+        self._inputVars = []
         for token in tokens:
             table, col, row = token.split('.')
-            other: ReactVar = self.reactFactory.df[table].at[row, col]
-            if isconnect:
-                val = other._value
-                self._evaluator.symtable[f'{table}_{col}_{row}'] = val
-                other.valueChangedSignal.connect(self._update_from_other_slot)
-            else:
-                other.valueChangedSignal.disconnect(self._update_from_other_slot)
-        if isconnect and self._func:
-            result = self._evaluate_expression(self._func)
-            if self.model == DBModel.tFunc:
-                self.inputValue = result
-            else:
-                self._value = result               
-                self.valueChangedSignal.emit(self)
-
-    @Slot(object)
-    def _update_from_other_slot(self, data: "ReactVar"):
-        val = data._value
-        self._evaluator.symtable[f'{data.tableName}_{data.colName}_{data.rowName}'] = val
-        result = self._evaluate_expression(self._func)
+            try:
+                self._inputVars.append(self.reactFactory.df[table].at[row, col])
+            except KeyError:
+                print(f"[WARN] Token inexistente em {self.tableName}.{self.colName}.{self.rowName}: {token}")
+                self._inputVars.append(None)
+        try:
+            self.reactFactory.graph.link(self, [v for v in self._inputVars if v is not None])
+        except ValueError as e:
+            print(f"[WARN] {e}")
+            self.reactFactory.graph.unlink(self)
+
+    def _evaluate_expression(self) -> float:
+        if self._expr is None:
+            return 0.0
+        return self._expr([None if v is None else v._value for v in self._inputVars])
+
+    def _recompute(self, isWidgetValueChanged: bool = False) -> bool:
+        """
+        Reavalia a expressão com os valores atuais das entradas (chamado pelo ReactGraph).
+        Retorna True se a saída desta variável mudou (tFunc só atualiza inputValue).
+        """
+        return self._applyResult(self._evaluate_expression(), isWidgetValueChanged)
+
+    def _applyResult(self, result: float, isWidgetValueChanged: bool = False) -> bool:
+        """Aplica um resultado já avaliado (escalar ou vindo da avaliação vetorizada)."""
         if self.model == DBModel.tFunc:
             self.inputValue = result
-        else:
-            self._value = result
-            self.isWidgetValueChanged = data.isWidgetValueChanged
-            self.valueChangedSignal.emit(self)           
\ No newline at end of file
+            return False
+        isChanged = (self._value != result)
+        self._value = result
+        self.isWidgetValueChanged = isWidgetValueChanged
+        return isChanged
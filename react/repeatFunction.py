@@ -1,4 +1,3 @@
-
 # repeatFunction.py — Tk/threading version (compatible with SimulTf usage)
 # Expected usage (from SimulTf):
 #    RepeatFunction(self._simulation_step, self.stepTime)
@@ -6,41 +5,110 @@
 #   - first arg is the function to call repeatedly
 #   - second arg is either an integer/float interval in ms OR a callable returning that interval
 #
-# Thread-safe start/stop. Re-arms itself after each tick.
+# Thread-safe start/stop. One long-lived worker thread per start(), ticking on
+# absolute monotonic deadlines (t0 + k*interval), so the period does not drift
+# with the run time of func. When a tick overruns its slot the `overrun` policy
+# decides what happens next:
+#   - "skip"     (default) drop the missed slots and stay on the original grid
+#   - "catch_up" run the missed ticks back-to-back (at most max_catch_up slots)
+#   - "stretch"  re-anchor the grid at the late tick (period stretches once)
 
 import threading
+import time
 from .qt_compat import QObject, Slot
 
+OVERRUN_POLICIES = ("skip", "catch_up", "stretch")
+
 class RepeatFunction(QObject):
-    def __init__(self, func, interval_ms_or_callable):
+    def __init__(self, func, interval_ms_or_callable, overrun: str = "skip", max_catch_up: int = 10):
         super().__init__()
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun deve ser um de {OVERRUN_POLICIES}: {overrun!r}")
         self._func = func
         self._interval_src = interval_ms_or_callable  # int/float in ms OR callable -> ms
-        self._timer = None
+        self.overrun = overrun
+        self.max_catch_up = max(1, int(max_catch_up))
+        self._thread = None
+        self._stop_event = None
         self._running = False
         self._lock = threading.Lock()
 
+        # Contadores (escritos só pela thread de trabalho)
+        self.ticks = 0                # execuções de func
+        self.missed = 0               # prazos não cumpridos (pulados ou atendidos com atraso)
+        self.last_period_s = None     # intervalo real entre os dois últimos ticks
+        self.mean_period_s = None     # média móvel exponencial do intervalo real
+
     def _get_interval_seconds(self) -> float:
         try:
             ms = self._interval_src() if callable(self._interval_src) else self._interval_src
-            return float(ms) / 1000.0
+            return max(1e-4, float(ms) / 1000.0)
         except Exception:
             # fallback para 50ms se houver erro de conversão
             return 0.050
 
-    def _tick(self):
-        with self._lock:
-            if not self._running:
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "interval_s": self._get_interval_seconds(),
+            "last_period_s": self.last_period_s,
+            "mean_period_s": self.mean_period_s,
+        }
+
+    def resetStats(self):
+        self.ticks = 0
+        self.missed = 0
+        self.last_period_s = None
+        self.mean_period_s = None
+
+    def _run(self, stop: threading.Event):
+        interval_s = self._get_interval_seconds()
+        deadline = time.monotonic() + interval_s
+        last = None
+        while True:
+            delay = deadline - time.monotonic()
+            if delay > 0 and stop.wait(delay):
                 return
-        try:
-            self._func()
-        finally:
-            with self._lock:
-                if self._running:
-                    interval_s = self._get_interval_seconds()
-                    self._timer = threading.Timer(interval_s, self._tick)
-                    self._timer.daemon = True
-                    self._timer.start()
+            if stop.is_set():
+                return
+
+            now = time.monotonic()
+            if last is not None:
+                self.last_period_s = now - last
+                self.mean_period_s = self.last_period_s if self.mean_period_s is None \
+                    else 0.9 * self.mean_period_s + 0.1 * self.last_period_s
+            last = now
+            try:
+                self._func()
+            except Exception as e:
+                print(f"[RepeatFunction] Erro no tick: {e}")
+            self.ticks += 1
+
+            # próximo prazo na grade absoluta; trata o atraso conforme a política
+            interval_s = self._get_interval_seconds()
+            deadline += interval_s
+            late = time.monotonic() - deadline
+            if late <= 0:
+                continue
+            if self.overrun == "catch_up":
+                self.missed += 1
+                behind = int(late // interval_s)
+                if behind >= self.max_catch_up:   # atraso grande demais: descarta o excedente
+                    skipped = behind - self.max_catch_up + 1
+                    self.missed += skipped
+                    deadline += skipped * interval_s
+            elif self.overrun == "stretch":
+                self.missed += 1
+                deadline = time.monotonic() + interval_s  # período recomeça no tick atrasado
+            else:  # skip
+                skipped = int(late // interval_s) + 1
+                self.missed += skipped
+                deadline += skipped * interval_s
 
     @Slot()
     def start(self):
@@ -48,22 +116,22 @@ class RepeatFunction(QObject):
             if self._running:
                 return
             self._running = True
-            interval_s = self._get_interval_seconds()
-            self._timer = threading.Timer(interval_s, self._tick)
-            self._timer.daemon = True
-            self._timer.start()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop_event,),
+                                            name="repeat-function", daemon=True)
+            self._thread.start()
 
     @Slot()
     def stop(self):
         with self._lock:
             self._running = False
-            t = self._timer
-            self._timer = None
-        if t:
-            try:
-                t.cancel()
-            except Exception:
-                pass
+            stop, t = self._stop_event, self._thread
+            self._stop_event = None
+            self._thread = None
+        if stop:
+            stop.set()
+        if t and t is not threading.current_thread():
+            t.join(timeout=1.0)
 
     def setInterval(self, interval_ms_or_callable):
         # permite trocar a fonte do intervalo em tempo de execução